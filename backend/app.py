@@ -3,13 +3,17 @@ import sys
 # Add the current directory to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask
 from flask_cors import CORS
-from src.models.user import db
+from src.models.user import init_database
 from src.routes.user import user_bp
 from src.routes.document import document_bp
 from src.routes.voice import voice_bp
 from src.routes.poh import poh_bp
+from src.routes.admin import admin_bp
+from src.services.admission import init_admission
+from src.services.profiling import init_profiling
+from src.services.static_assets import init_static_assets
 
 def create_app():
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
@@ -23,26 +27,23 @@ def create_app():
     app.register_blueprint(document_bp, url_prefix='/api/document')
     app.register_blueprint(voice_bp, url_prefix='/api/voice')
     app.register_blueprint(poh_bp, url_prefix='/api/poh')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
 
-    # Database setup
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    db.init_app(app)
-    
-    # Create database directory if it doesn't exist
-    os.makedirs(os.path.join(os.path.dirname(__file__), 'database'), exist_ok=True)
-    
-    with app.app_context():
-        db.create_all()
+    # Concurrency limits and load shedding for the expensive endpoints;
+    # registered first so shed requests skip every other hook
+    init_admission(app)
+
+    # Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE)
+    init_profiling(app)
+
+    # Database setup: SQLite in WAL mode with pooled connections (creates the
+    # database directory if it doesn't exist)
+    init_database(app, os.path.join(os.path.dirname(__file__), 'database', 'app.db'))
     
-    # Serve frontend static files
-    @app.route('/', defaults={'path': ''})
-    @app.route('/<path:path>')
-    def serve(path):
-        if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-            return send_from_directory(app.static_folder, path)
-        else:
-            return send_from_directory(app.static_folder, 'index.html')
+    # Serve frontend static files from a manifest built at startup (hashed
+    # assets cached as immutable, the rest revalidated by ETag, gzip/brotli
+    # variants when the client accepts them)
+    init_static_assets(app)
     
     return app
 
@@ -0,0 +1,11 @@
+"""
+Benchmark Suite
+Reproducible timings for retrieval, ingestion, extraction and end-to-end QA.
+
+Run from the backend directory:
+
+    python -m benchmarks --scales 1 10 100 --output bench.json
+
+Results are written as JSON so runs from different releases can be compared
+with ``python -m benchmarks --compare old.json new.json``.
+"""
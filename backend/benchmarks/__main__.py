@@ -0,0 +1,62 @@
+"""
+Benchmark command line entry point
+
+    python -m benchmarks [--scales 1 10 100] [--suites retrieval endpoints] [--output bench.json]
+    python -m benchmarks --compare baseline.json current.json [--threshold 0.1]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import warnings
+
+# Make ``src`` importable the same way app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import corpus as corpora
+from benchmarks.harness import BenchmarkRun, compare
+from benchmarks.suites import SUITES
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="corpus replication factors (default: 1 10 100)")
+    parser.add_argument("--suites", nargs="+", choices=sorted(SUITES), default=list(SUITES),
+                        help="suites to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed iterations at scale 1")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed warmup iterations")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files and exit non-zero on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative median slowdown counted as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        report = compare(args.compare[0], args.compare[1], threshold=args.threshold)
+        print(json.dumps(report, indent=2, sort_keys=True))
+        return 1 if report["regressions"] else 0
+
+    # Never let a benchmark reach the real OpenAI API
+    os.environ.pop("OPENAI_API_KEY", None)
+    warnings.filterwarnings("ignore")
+
+    run = BenchmarkRun(repeat=args.repeat, warmup=args.warmup)
+    bundled = corpora.load_bundled()
+    # Service start-up chatter goes to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        for scale in args.scales:
+            corpus = corpora.scale_corpus(bundled, scale)
+            for name in args.suites:
+                SUITES[name](run, corpus, scale)
+
+    run.write(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
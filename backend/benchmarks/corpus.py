@@ -0,0 +1,128 @@
+"""
+Benchmark Corpora
+Loads the bundled POH data and builds deterministic scaled copies and file fixtures
+"""
+
+import copy
+import json
+import os
+import re
+from typing import Dict, List
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def load_bundled() -> Dict:
+    """Load the bundled POH content, chunks and full text"""
+    with open(os.path.join(DATA_DIR, "poh_content.json"), "r") as f:
+        content = json.load(f)
+    with open(os.path.join(DATA_DIR, "poh_chunks.json"), "r") as f:
+        chunks = json.load(f)
+    with open(os.path.join(DATA_DIR, "poh_full_text.txt"), "r") as f:
+        full_text = f.read()
+    return {"content": content, "chunks": chunks, "full_text": full_text}
+
+
+def scale_corpus(corpus: Dict, factor: int) -> Dict:
+    """Replicate the corpus ``factor`` times.
+
+    Copies get fresh page numbers and chunk ids so they index as distinct
+    documents, while the text (and so term statistics per copy) is unchanged.
+    """
+    if factor <= 1:
+        return corpus
+
+    content = corpus["content"]
+    page_count = len(content["pages"])
+    pages, sections, chunks, texts = [], [], [], []
+
+    for copy_index in range(factor):
+        offset = copy_index * page_count
+        for page in content["pages"]:
+            pages.append({"page_number": page["page_number"] + offset, "text": page["text"]})
+        for section in content["sections"]:
+            sections.append({"title": section["title"], "page": section["page"] + offset})
+        for chunk in corpus["chunks"]:
+            scaled = copy.deepcopy(chunk)
+            scaled["id"] = f"{chunk['id']}_x{copy_index}"
+            scaled["metadata"]["chunk_index"] = len(chunks)
+            chunks.append(scaled)
+        texts.append(re.sub(r"--- Page (\d+) ---",
+                            lambda m: f"--- Page {int(m.group(1)) + offset} ---",
+                            corpus["full_text"]))
+
+    full_text = "\n\n".join(texts)
+    scaled_content = dict(content, pages=pages, sections=sections, full_text=full_text)
+    return {"content": scaled_content, "chunks": chunks, "full_text": full_text}
+
+
+def page_texts(corpus: Dict) -> List[str]:
+    return [page["text"] for page in corpus["content"]["pages"]]
+
+
+def write_txt(path: str, corpus: Dict, encoding: str = "utf-8") -> str:
+    with open(path, "w", encoding=encoding, errors="replace") as f:
+        f.write(corpus["full_text"])
+    return path
+
+
+def write_docx(path: str, corpus: Dict) -> str:
+    from docx import Document
+
+    doc = Document()
+    for text in page_texts(corpus):
+        for line in text.split("\n"):
+            # python-docx rejects XML control characters
+            doc.add_paragraph("".join(ch for ch in line if ch == "\t" or ch >= " "))
+    doc.save(path)
+    return path
+
+
+def _pdf_escape(line: str) -> bytes:
+    data = line.encode("latin-1", errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def write_pdf(path: str, corpus: Dict) -> str:
+    """Write a minimal text PDF with one page per POH page.
+
+    Avoids a PDF authoring dependency; the output only needs to be readable
+    by PyPDF2's text extraction.
+    """
+    texts = page_texts(corpus)
+    objects: List[bytes] = []
+
+    # 1: catalog, 2: page tree, 3: font; pages and content streams follow
+    page_ids = [4 + 2 * i for i in range(len(texts))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects.append(b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(texts))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for page_id, text in zip(page_ids, texts):
+        lines = [b"BT /F1 10 Tf 12 TL 40 780 Td"]
+        for line in text.split("\n"):
+            lines.append(b"(" + _pdf_escape(line) + b") Tj T*")
+        lines.append(b"ET")
+        stream = b"\n".join(lines)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_id + 1)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+    return path
@@ -0,0 +1,154 @@
+"""
+Benchmark Harness
+Timing loop, result records and regression comparison
+"""
+
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+SCHEMA_VERSION = 1
+
+
+def measure(fn: Callable[[], object], repeat: int = 20, warmup: int = 2) -> Dict:
+    """Time ``fn`` ``repeat`` times after ``warmup`` untimed calls"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            fn()
+            samples.append((time.perf_counter_ns() - start) / 1e6)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    samples.sort()
+    p95_index = min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))
+    return {
+        "min": samples[0],
+        "max": samples[-1],
+        "mean": statistics.fmean(samples),
+        "median": statistics.median(samples),
+        "p95": samples[p95_index],
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+class BenchmarkRun:
+    """Collects benchmark results and serializes them to JSON"""
+
+    def __init__(self, repeat: int = 20, warmup: int = 2):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.results: List[Dict] = []
+
+    def run(self, name: str, fn: Callable[[], object], scale: int = 1,
+            repeat: Optional[int] = None, **params) -> Dict:
+        """Measure ``fn`` and record it under ``name``"""
+        repeat = repeat or self.repeat
+        stats = measure(fn, repeat=repeat, warmup=self.warmup)
+        result = {
+            "name": name,
+            "scale": scale,
+            "params": params,
+            "iterations": repeat,
+            "stats_ms": {key: round(value, 4) for key, value in stats.items()},
+        }
+        self.results.append(result)
+        print(f"{name:<45} x{scale:<4} median {stats['median']:10.3f} ms  p95 {stats['p95']:10.3f} ms",
+              file=sys.stderr)
+        return result
+
+    def record(self, name: str, scale: int = 1, **values) -> Dict:
+        """Record a non-timing measurement (sizes, memory, counts)"""
+        result = {"name": name, "scale": scale, "values": values}
+        self.results.append(result)
+        print(f"{name:<45} x{scale:<4} {values}", file=sys.stderr)
+        return result
+
+    def to_dict(self) -> Dict:
+        return {
+            "schema": SCHEMA_VERSION,
+            "meta": environment_info(),
+            "config": {"repeat": self.repeat, "warmup": self.warmup},
+            "results": self.results,
+        }
+
+    def write(self, path: Optional[str]):
+        payload = json.dumps(self.to_dict(), indent=2, sort_keys=True)
+        if path:
+            with open(path, "w") as f:
+                f.write(payload + "\n")
+        else:
+            print(payload)
+
+
+def environment_info() -> Dict:
+    """Describe the machine and revision a run was taken on"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "git_commit": commit,
+    }
+
+
+def _result_key(result: Dict) -> str:
+    params = json.dumps(result.get("params", {}), sort_keys=True)
+    return f"{result['name']}|{result['scale']}|{params}"
+
+
+def compare(baseline_path: str, current_path: str, threshold: float = 0.10) -> Dict:
+    """Compare median timings of two result files.
+
+    A benchmark is flagged as a regression when its median grew by more than
+    ``threshold`` (a fraction, 0.10 == 10%).
+    """
+    with open(baseline_path, "r") as f:
+        baseline = {_result_key(r): r for r in json.load(f)["results"] if "stats_ms" in r}
+    with open(current_path, "r") as f:
+        current = {_result_key(r): r for r in json.load(f)["results"] if "stats_ms" in r}
+
+    rows = []
+    for key in sorted(baseline.keys() & current.keys()):
+        before = baseline[key]["stats_ms"]["median"]
+        after = current[key]["stats_ms"]["median"]
+        change = (after - before) / before if before else 0.0
+        rows.append({
+            "name": current[key]["name"],
+            "scale": current[key]["scale"],
+            "params": current[key].get("params", {}),
+            "baseline_median_ms": before,
+            "current_median_ms": after,
+            "change": round(change, 4),
+            "regression": change > threshold,
+        })
+
+    return {
+        "threshold": threshold,
+        "regressions": sum(1 for row in rows if row["regression"]),
+        "only_in_baseline": sorted(baseline.keys() - current.keys()),
+        "only_in_current": sorted(current.keys() - baseline.keys()),
+        "results": rows,
+    }
@@ -0,0 +1,72 @@
+"""
+Labelled Questions
+POH questions with the pages that answer them, for retrieval relevance
+
+Pages are those of the bundled 1967 Cherokee Six POH scan. A retrieved chunk
+counts as relevant when it starts on or runs into one of the listed pages.
+"""
+
+from typing import Dict, List, Set
+
+from src.services.chunk_store import PAGE_MARKER
+
+LABELLED_QUESTIONS = [
+    ("What are the takeoff procedures?", [73]),
+    ("What should I do in case of an engine fire?", [55]),
+    ("What do I do if the alternator fails?", [57]),
+    ("What causes a loss of oil pressure and what should I do?", [56]),
+    ("How do I recover from a spin?", [54]),
+    ("How do I make a power off landing?", [53]),
+    ("What to do after engine power loss during takeoff?", [51]),
+    ("How do I drain the fuel system?", [106, 107]),
+    ("How is the fuel system arranged?", [18]),
+    ("What is the maximum gross weight?", [7, 8, 37]),
+    ("What is the stall speed with flaps down?", [43, 7, 93]),
+    ("What is the never exceed speed?", [37]),
+    ("How does the pitot-static system work?", [27]),
+    ("What does the vacuum system power?", [25]),
+    ("What is on the preflight checklist?", [69, 70]),
+    ("How is the airplane weighed?", [61]),
+    ("What should I do when parking the airplane?", [99]),
+    ("How do I clean the exterior surfaces?", [101]),
+    ("How should I fly in turbulent air?", [76]),
+    ("How do I stop the engine?", [77]),
+    ("How is the propeller serviced?", [105]),
+    ("How long should the engine warm up?", [72]),
+    ("What does the electrical system include?", [21]),
+    ("How do I operate the air conditioning?", [78]),
+    ("How should I use the mixture control in cruise?", [75]),
+    ("What placards are required?", [38]),
+    ("What is the best rate of climb speed?", [73, 74, 7]),
+    ("How do I start the engine when it is hot?", [71]),
+    ("What are the landing gear tire pressures?", [9, 104, 107]),
+    ("What type of oil should be used?", [105, 111, 8]),
+]
+
+
+def chunk_pages(chunks) -> List[Set[int]]:
+    """Pages each chunk covers: the page it starts on plus any page markers in it"""
+    pages, current = [], -1
+    for chunk in chunks:
+        text = chunk["text"]
+        markers = [int(page) for page in PAGE_MARKER.findall(text)]
+        covered = set(markers)
+        if not text.startswith("--- Page"):
+            covered.add(current)
+        if markers:
+            current = markers[-1]
+        pages.append(covered)
+    return pages
+
+
+def relevance(ranked: List[List[int]], pages: List[Set[int]], k: int) -> Dict:
+    """hit@k and mean reciprocal rank over LABELLED_QUESTIONS for ranked chunk positions"""
+    hits, reciprocal = 0, 0.0
+    for positions, (_, gold) in zip(ranked, LABELLED_QUESTIONS):
+        for rank, position in enumerate(positions[:k], 1):
+            if pages[position] & set(gold):
+                hits += 1
+                reciprocal += 1 / rank
+                break
+    count = len(LABELLED_QUESTIONS)
+    return {f"hit_at_{k}": round(hits / count, 3), f"mrr_at_{k}": round(reciprocal / count, 3)}
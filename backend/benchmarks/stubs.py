@@ -0,0 +1,51 @@
+"""
+LLM Stubs
+Offline stand-ins for the OpenAI client and langchain models so benchmarks
+measure our own code paths without network round trips
+"""
+
+from types import SimpleNamespace
+from typing import List
+
+STUB_ANSWER = "The maximum gross weight is 3400 lbs (stub answer)."
+
+
+class _StubCompletions:
+    def __init__(self, answer: str):
+        self.answer = answer
+        self.calls = 0
+        self.last_messages: List[dict] = []
+
+    def create(self, model=None, messages=None, **kwargs):
+        self.calls += 1
+        self.last_messages = messages or []
+        message = SimpleNamespace(content=self.answer)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class StubOpenAIClient:
+    """Mimics ``openai.OpenAI().chat.completions.create``"""
+
+    def __init__(self, answer: str = STUB_ANSWER):
+        self.chat = SimpleNamespace(completions=_StubCompletions(answer))
+
+
+def stub_chat_model(answer: str = STUB_ANSWER):
+    """A langchain chat model that always returns ``answer``"""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    return FakeListChatModel(responses=[answer])
+
+
+def stub_embeddings(size: int = 256):
+    """Deterministic hash-based embeddings, no API calls"""
+    from langchain_core.embeddings.fake import DeterministicFakeEmbedding
+
+    return DeterministicFakeEmbedding(size=size)
+
+
+def stub_vector_store(texts: List[str], title: str, embeddings):
+    """In-memory vector store standing in for FAISS"""
+    from langchain_core.vectorstores import InMemoryVectorStore
+
+    return InMemoryVectorStore.from_texts(texts, embeddings, metadatas=[{"source": title}] * len(texts))
@@ -0,0 +1,412 @@
+"""
+Benchmark Suites
+Retrieval, relevance, ingestion, extraction, memory, end-to-end endpoint and
+user API benchmarks
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+
+from flask import Flask
+
+from benchmarks import corpus as corpora
+from benchmarks.harness import BenchmarkRun
+from benchmarks.stubs import (
+    StubOpenAIClient, stub_chat_model, stub_embeddings, stub_vector_store,
+)
+
+QUESTIONS = [
+    "What is the maximum gross weight?",
+    "What are the engine specifications?",
+    "What is the fuel capacity?",
+    "What are the takeoff procedures?",
+    "What are the landing procedures?",
+    "What are the emergency procedures?",
+    "What is the cruise speed?",
+    "What are the electrical system specifications?",
+]
+
+MISSPELLED_QUESTIONS = [
+    "What is the fule capasity?",
+    "What are the emergncy proceedures?",
+    "alternater failure",
+    "landng gear extention",
+]
+
+
+# Spec questions answered from the precomputed fact table
+FACT_QUESTIONS = [
+    "What is the maximum gross weight?",
+    "What is the fuel capacity?",
+    "What is the cruise speed?",
+    "What's the MTOW?",
+    "How much oil does the engine hold?",
+    "What is the stall speed with flaps down?",
+    "What is Vfe?",
+    "What is the service ceiling?",
+]
+
+
+# (opening question, follow-ups) for session retrieval
+CONVERSATION = ("What are the takeoff procedures?",
+                ["and what about landing?", "what about the flaps?", "and with a crosswind?"])
+
+
+def _repeat_for(run: BenchmarkRun, scale: int) -> int:
+    """Fewer iterations for the large corpora, never fewer than three"""
+    return max(3, run.repeat // scale)
+
+
+@contextmanager
+def patched(target, **attributes):
+    """Temporarily replace attributes on a module or object"""
+    saved = {name: getattr(target, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(target, name, value)
+    try:
+        yield target
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+def make_poh_service(corpus):
+    from src.services.poh_qa import POHQAService
+
+    service = POHQAService(data_dir=corpora.DATA_DIR)
+    service.content = corpus["content"]
+    service.chunks = corpus["chunks"]
+    service.client = StubOpenAIClient()
+    return service
+
+
+def make_app() -> Flask:
+    """A minimal app with just the blueprints under test (no database)"""
+    from src.routes.document import document_bp
+    from src.routes.poh import poh_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(document_bp, url_prefix="/api/document")
+    app.register_blueprint(poh_bp, url_prefix="/api/poh")
+    return app
+
+
+def bench_retrieval(run: BenchmarkRun, corpus, scale: int):
+    from src.routes.document import simple_search
+
+    service = make_poh_service(corpus)
+    repeat = _repeat_for(run, scale)
+
+    run.run("poh.search_relevant_chunks", lambda: [service.search_relevant_chunks(q) for q in QUESTIONS],
+            scale=scale, repeat=repeat, queries=len(QUESTIONS), chunks=len(corpus["chunks"]))
+
+    # Misspelled questions take the fuzzy path (deletion index lookups)
+    run.run("poh.search_relevant_chunks.misspelled",
+            lambda: [service.search_relevant_chunks(q) for q in MISSPELLED_QUESTIONS],
+            scale=scale, repeat=repeat, queries=len(MISSPELLED_QUESTIONS))
+
+    text = corpus["full_text"]
+    run.run("document.simple_search", lambda: [simple_search(q, text) for q in QUESTIONS],
+            scale=scale, repeat=repeat, queries=len(QUESTIONS), text_length=len(text))
+
+    # Without an LLM client generate_answer is retrieval plus string assembly
+    run.run("poh.generate_answer.no_llm",
+            lambda: [_without_client(service, q) for q in QUESTIONS],
+            scale=scale, repeat=repeat, queries=len(QUESTIONS))
+
+    # Fact table hits never reach retrieval; the uncached lookup is the
+    # question analysis plus one dict probe
+    run.run("poh.generate_answer.spec_facts", lambda: [service.generate_answer(q) for q in FACT_QUESTIONS],
+            scale=scale, repeat=repeat, queries=len(FACT_QUESTIONS), facts=len(service.fact_table))
+    # Follow-ups ranked within the session's cached candidates vs a full search
+    from src.services.conversation import ConversationSession
+    session = ConversationSession("benchmark")
+    service.generate_answer(CONVERSATION[0], session)
+    run.run("poh.search_session_chunks.follow_up", lambda: _follow_ups(service, session),
+            scale=scale, repeat=repeat, queries=len(CONVERSATION[1]), candidates=len(session.candidates))
+    run.run("poh.search_relevant_chunks.follow_up_full",
+            lambda: [service.search_relevant_chunks(f"{q} {CONVERSATION[0]}") for q in CONVERSATION[1]],
+            scale=scale, repeat=repeat, queries=len(CONVERSATION[1]))
+
+    run.run("spec_facts.lookup.uncached", lambda: [service.fact_table._lookup(q) for q in FACT_QUESTIONS],
+            scale=scale, repeat=repeat, queries=len(FACT_QUESTIONS))
+
+
+def bench_relevance(run: BenchmarkRun, corpus, scale: int):
+    """Lexical ranking versus the re-ranked top chunks on the labelled questions"""
+    from benchmarks.labelled import LABELLED_QUESTIONS, chunk_pages, relevance
+    from src.services import poh_qa
+    from src.services.reranker import POH_RERANK_CANDIDATES, POH_RERANK_TOP_K
+
+    service = make_poh_service(corpus)
+    # Measured whether or not POH_RERANK is set in this environment
+    with patched(poh_qa, POH_RERANK=True):
+        service.build_lexical_index()
+    index, reranker = service.lexical_index, service.reranker
+    questions = [question for question, _ in LABELLED_QUESTIONS]
+    first_stage = [index.search(question, POH_RERANK_CANDIDATES) for question in questions]
+    repeat = _repeat_for(run, scale)
+
+    run.run("poh.rerank", lambda: [reranker.rerank(q, hits) for q, hits in zip(questions, first_stage)],
+            scale=scale, repeat=repeat, queries=len(questions), candidates=POH_RERANK_CANDIDATES)
+    run.run("poh.search_relevant_chunks.reranked", lambda: [service.search_relevant_chunks(q) for q in questions],
+            scale=scale, repeat=repeat, queries=len(questions))
+
+    # Gold pages are those of the bundled POH, so accuracy is measured unscaled
+    if scale != 1:
+        return
+    chunks = corpus["chunks"]
+    pages = chunk_pages(chunks)
+    lexical = [[position for position, _ in hits] for hits in first_stage]
+    reranked = [[position for position, _ in reranker.rerank(q, hits, 5)] for q, hits in zip(questions, first_stage)]
+
+    def context_chars(ranked, k):
+        return round(sum(len(chunks[p]["text"]) for positions in ranked for p in positions[:k]) / len(ranked))
+
+    top_k = POH_RERANK_TOP_K
+    run.record("poh.relevance.lexical", scale=scale, questions=len(questions),
+               **relevance(lexical, pages, top_k), **relevance(lexical, pages, 5),
+               context_chars_at_5=context_chars(lexical, 5))
+    run.record("poh.relevance.reranked", scale=scale, questions=len(questions),
+               **relevance(reranked, pages, top_k), **relevance(reranked, pages, 5),
+               context_chars_at_top_k=context_chars(reranked, top_k),
+               prompt_reduction=round(1 - context_chars(reranked, top_k) / context_chars(lexical, 5), 2))
+
+
+def _follow_ups(service, session):
+    return [service.search_session_chunks(question, session) for question in CONVERSATION[1]]
+
+
+def _without_client(service, question):
+    with patched(service, client=None):
+        return service.generate_answer(question)
+
+
+def bench_ingestion(run: BenchmarkRun, corpus, scale: int):
+    from src.routes import document
+    from src.services.document_index import split_pages
+
+    text = corpus["full_text"]
+    repeat = _repeat_for(run, scale)
+    with patched(document, simple_mode=True, current_vector_store=None, current_index=None,
+                 current_document_title=None):
+        run.run("document.process_document_text.simple", lambda: document.process_document_text(text, "bench"),
+                scale=scale, repeat=repeat, text_length=len(text))
+
+        # One revised page applied incrementally, alternating between two versions
+        index = document.current_index
+        pages = split_pages(text)
+        number = sorted(pages)[len(pages) // 2]
+        versions = [pages[number] + "\nRevised.", pages[number]]
+        state = {"turn": 0}
+
+        def revise():
+            state["turn"] ^= 1
+            return index.update_pages({number: versions[state["turn"]]})
+
+        run.run("document_index.update_pages.one_page", revise, scale=scale, repeat=repeat,
+                pages=len(pages))
+
+    _bench_quantized_store(run, corpus, scale)
+
+
+def _bench_quantized_store(run: BenchmarkRun, corpus, scale: int):
+    """Resident size and query time of the int8 store at the production dimension"""
+    from src.services.quantized_store import QuantizedVectorStore
+
+    embeddings = stub_embeddings(1536)
+    texts = [chunk["text"] for chunk in corpus["chunks"]]
+    vectors = embeddings.embed_documents(texts)
+    ids = [str(i) for i in range(len(texts))]
+
+    tracemalloc.start()
+    store = QuantizedVectorStore(embeddings)
+    store.add_embeddings(texts, vectors, ids=ids)
+    resident = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # What a float32 index holding the same texts keeps in memory, at minimum
+    float32_bytes = len(vectors) * len(vectors[0]) * 4 + sum(len(text) for text in texts)
+    run.record("quantized_store.memory", scale=scale, chunks=len(texts),
+               resident_kib=resident // 1024, float32_kib=float32_bytes // 1024,
+               reduction=round(float32_bytes / resident, 1))
+
+    query = embeddings.embed_query(QUESTIONS[0])
+    repeat = _repeat_for(run, scale)
+    for rerank in (True, False):
+        store.rerank = rerank
+        run.run(f"quantized_store.search.{'rerank' if rerank else 'int8'}",
+                lambda: store.similarity_search_by_vector(query, 3), scale=scale, repeat=repeat,
+                chunks=len(texts))
+
+
+def bench_extraction(run: BenchmarkRun, corpus, scale: int):
+    from src.routes import document
+
+    workdir = tempfile.mkdtemp(prefix="poh-bench-")
+    try:
+        txt_path = corpora.write_txt(os.path.join(workdir, "poh.txt"), corpus)
+        latin_path = corpora.write_txt(os.path.join(workdir, "poh-latin1.txt"), corpus, encoding="latin-1")
+        with open(latin_path, "ab") as f:
+            f.write(b"\xb0F\n")  # not valid UTF-8, forces the fallback decode
+        docx_path = corpora.write_docx(os.path.join(workdir, "poh.docx"), corpus)
+        pdf_path = corpora.write_pdf(os.path.join(workdir, "poh.pdf"), corpus)
+
+        repeat = _repeat_for(run, scale)
+        for name, fn, path in [
+            ("document.extract_text_from_txt", document.extract_text_from_txt, txt_path),
+            ("document.extract_text_from_txt.latin1", document.extract_text_from_txt, latin_path),
+            ("document.extract_text_from_docx", document.extract_text_from_docx, docx_path),
+            ("document.extract_text_from_pdf", document.extract_text_from_pdf, pdf_path),
+        ]:
+            run.run(name, lambda fn=fn, path=path: fn(path), scale=scale, repeat=repeat,
+                    file_bytes=os.path.getsize(path))
+
+        # Peak Python heap of extracting and chunking an upload in one pass
+        with patched(document, simple_mode=True):
+            for extension, path in [("txt", txt_path), ("docx", docx_path), ("pdf", pdf_path)]:
+                run.record(f"document.build_document_index.{extension}.peak_memory", scale=scale,
+                           peak_kib=_peak_kib(lambda: document.build_document_index(
+                               document.iter_document_pages(path, extension), "bench")),
+                           file_bytes=os.path.getsize(path))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _peak_kib(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def bench_endpoints(run: BenchmarkRun, corpus, scale: int):
+    from src.routes import document
+    from src.services import poh_qa
+    from src.services.document_index import DocumentIndex, split_pages
+
+    app = make_app()
+    client = app.test_client()
+    repeat = _repeat_for(run, scale)
+    service = make_poh_service(corpus)
+
+    with patched(poh_qa, poh_qa_service=service), patched(_poh_routes(), poh_qa_service=service):
+        run.run("endpoint.poh.ask", lambda: _post_all(client, "/api/poh/ask"),
+                scale=scale, repeat=repeat, queries=len(QUESTIONS))
+
+    index = DocumentIndex("bench")
+    index.build(split_pages(corpus["full_text"]))
+    with patched(document, simple_mode=True, current_vector_store="simple_mode", current_index=index,
+                 current_document_title="bench"):
+        run.run("endpoint.document.query.simple", lambda: _post_all(client, "/api/document/query"),
+                scale=scale, repeat=repeat, queries=len(QUESTIONS))
+
+    embeddings = stub_embeddings()
+    splits = [chunk["text"] for chunk in corpus["chunks"]]
+    store = stub_vector_store(splits, "bench", embeddings)
+    with patched(document, simple_mode=False, embeddings=embeddings, llm=stub_chat_model(),
+                 current_vector_store=store, current_index=None, current_qa_chain=None,
+                 current_document_title="bench"):
+        run.run("endpoint.document.query.vector", lambda: _post_all(client, "/api/document/query"),
+                scale=scale, repeat=repeat, queries=len(QUESTIONS))
+
+
+def _poh_routes():
+    from src.routes import poh
+
+    return poh
+
+
+def _post_all(client, url):
+    for question in QUESTIONS:
+        response = client.post(url, json={"question": question})
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}: {response.get_data(as_text=True)}")
+
+
+def bench_memory(run: BenchmarkRun, corpus, scale: int):
+    """Resident size of the POH chunks as JSON dicts versus the column store"""
+    from src.services.chunk_store import ChunkStore
+
+    serialized = json.dumps(corpus["chunks"])
+    sections = corpus["content"]["sections"]
+
+    def retained(build):
+        tracemalloc.start()
+        value = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return value, size
+
+    dicts, dict_bytes = retained(lambda: json.loads(serialized))
+    store, store_bytes = retained(lambda: ChunkStore.from_dicts(json.loads(serialized), sections))
+    run.record("chunks.memory", scale=scale, chunks=len(store),
+               dicts_kib=dict_bytes // 1024, chunk_store_kib=store_bytes // 1024,
+               reduction=round(dict_bytes / store_bytes, 1))
+
+    repeat = _repeat_for(run, scale)
+    run.run("chunks.iterate_text.dicts", lambda: [chunk["text"] for chunk in dicts],
+            scale=scale, repeat=repeat, chunks=len(dicts))
+    run.run("chunks.iterate_text.chunk_store", lambda: list(store.texts()),
+            scale=scale, repeat=repeat, chunks=len(store))
+    run.run("chunks.iterate_text.chunk_view", lambda: [chunk["text"] for chunk in store],
+            scale=scale, repeat=repeat, chunks=len(store))
+
+
+def bench_users(run: BenchmarkRun, corpus, scale: int):
+    """Bulk provisioning and keyset pages of the user API on a scratch SQLite file"""
+    from src.models.user import init_database
+    from src.routes.user import MAX_BULK_USERS, user_bp
+
+    workdir = tempfile.mkdtemp(prefix="bench-users-")
+    try:
+        app = Flask(__name__)
+        init_database(app, os.path.join(workdir, "database", "app.db"))
+        app.register_blueprint(user_bp, url_prefix="/api")
+        client = app.test_client()
+        repeat = _repeat_for(run, scale)
+        batch = min(1000 * scale, MAX_BULK_USERS)
+        state = {"batch": 0}
+
+        def create():
+            state["batch"] += 1
+            prefix = f"pilot{state['batch']}-"
+            users = [{"username": f"{prefix}{i}", "email": f"{prefix}{i}@school.test"} for i in range(batch)]
+            _check(client.post("/api/users/bulk", json=users), 201)
+
+        run.run("endpoint.users.bulk_create", create, scale=scale, repeat=repeat, users=batch)
+
+        total = state["batch"] * batch
+        updates = [{"id": user_id, "email": f"moved{user_id}@school.test"} for user_id in range(1, batch + 1)]
+        run.run("endpoint.users.bulk_update", lambda: _check(client.patch("/api/users/bulk", json=updates)),
+                scale=scale, repeat=repeat, users=batch)
+        run.run("endpoint.users.list.first_page", lambda: _check(client.get("/api/users?limit=100")),
+                scale=scale, repeat=repeat, rows=total)
+        # Keyset pages cost the same at the end of the table as at the start
+        run.run("endpoint.users.list.last_page",
+                lambda: _check(client.get(f"/api/users?limit=100&after={total - 100}&fields=id,username")),
+                scale=scale, repeat=repeat, rows=total)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _check(response, status=200):
+    if response.status_code != status:
+        raise RuntimeError(f"{response.request.path} returned {response.status_code}: {response.get_data(as_text=True)}")
+
+
+SUITES = {
+    "retrieval": bench_retrieval,
+    "relevance": bench_relevance,
+    "ingestion": bench_ingestion,
+    "extraction": bench_extraction,
+    "endpoints": bench_endpoints,
+    "memory": bench_memory,
+    "users": bench_users,
+}
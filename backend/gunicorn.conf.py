@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration
+Publishes the POH corpus to shared memory once, in the master process, so
+every worker maps the same read-only copy instead of loading its own.
+Uploaded documents are shared between workers on the same mechanism.
+
+Set SHARED_CORPUS=0 to give each worker a private copy again.
+
+Workers are threaded (gthread) so the admission gates in
+src/services/admission.py see concurrent requests; their limits apply per
+worker process. A request waiting in a gate queue holds one of the worker's
+GUNICORN_THREADS threads, so keep the thread count above the largest gate's
+max_concurrent plus max_queue, or queued requests will crowd out endpoints
+without a gate.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SHARED_CHANNELS = ("poh", "document")
+
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "48"))
+
+
+def on_starting(server):
+    os.environ.setdefault("SHARED_CORPUS", "1")
+    # Workers fall back to the same directory if the segment is missing
+    os.environ.setdefault("POH_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+    from src.services import shared_corpus
+    if not shared_corpus.is_enabled():
+        return
+    try:
+        shared_corpus.publish_poh_from_dir(os.environ["POH_DATA_DIR"])
+    except Exception as e:
+        server.log.warning(f"Shared POH corpus not published: {e}")
+
+
+def on_exit(server):
+    from src.services import shared_corpus
+    if not shared_corpus.is_enabled():
+        return
+    for channel in SHARED_CHANNELS:
+        try:
+            shared_corpus.unpublish(channel)
+        except Exception as e:
+            server.log.warning(f"Could not remove shared {channel} corpus: {e}")
@@ -3,13 +3,17 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, jsonify
 from flask_cors import CORS
-from src.models.user import db
+from src.models.user import init_database
 from src.routes.user import user_bp
 from src.routes.document import document_bp
 from src.routes.voice import voice_bp
 from src.routes.poh import poh_bp
+from src.routes.admin import admin_bp
+from src.services.admission import init_admission
+from src.services.profiling import init_profiling
+from src.services.static_assets import init_static_assets
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -22,13 +26,17 @@ app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(document_bp, url_prefix='/api/document')
 app.register_blueprint(voice_bp, url_prefix='/api/voice')
 app.register_blueprint(poh_bp, url_prefix='/api/poh')
+app.register_blueprint(admin_bp, url_prefix='/api/admin')
 
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
+# Concurrency limits and load shedding for the expensive endpoints;
+# registered first so shed requests skip every other hook
+init_admission(app)
+
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE)
+init_profiling(app)
+
+# SQLite in WAL mode with pooled connections, in the same backend/database/app.db as app.py
+init_database(app, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'app.db'))
 
 # Error handlers
 @app.errorhandler(404)
@@ -51,21 +59,9 @@ def health_check():
         'service': 'AI Document Assistant Backend'
     })
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return jsonify({'error': 'Static folder not configured'}), 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return jsonify({'error': 'Frontend not found'}), 404
+# Frontend build served from a manifest built at startup (hashed assets are
+# cached as immutable, the rest revalidated by ETag, gzip/brotli when accepted)
+init_static_assets(app)
 
 
 if __name__ == '__main__':
@@ -1,18 +1,56 @@
+import os
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 db = SQLAlchemy()
 
+# Applied to every new SQLite connection: WAL lets readers run alongside the
+# single writer, busy_timeout makes a second writer wait instead of failing
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def init_database(app, database_path):
+    """Configure ``app`` for the SQLite file at ``database_path`` and create the tables"""
+    os.makedirs(os.path.dirname(database_path), exist_ok=True)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # One pooled connection per worker thread instead of a new file handle per request
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "8")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "8")),
+        "pool_pre_ping": False,
+        "connect_args": {"check_same_thread": False, "timeout": 15},
+    })
+    db.init_app(app)
+    with app.app_context():
+        # The listener must be in place before the engine opens its first connection
+        event.listen(db.engine, "connect", _apply_sqlite_pragmas)
+        db.create_all()
+
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
 
+    # Columns a client may request with ?fields=
+    FIELDS = ('id', 'username', 'email')
+
     def __repr__(self):
         return f'<User {self.username}>'
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email
-        }
+    def to_dict(self, fields=FIELDS):
+        return {field: getattr(self, field) for field in fields}
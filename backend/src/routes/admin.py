@@ -0,0 +1,79 @@
+"""
+Admin API Routes
+Operational endpoints (request profiles, admission metrics). Disabled unless ADMIN_TOKEN is set;
+callers must send it in the X-Admin-Token header.
+"""
+
+import hmac
+import os
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from src.services.admission import admission_controller
+from src.services.profiling import profile_store
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.before_request
+def require_admin_token():
+    """Reject requests without the configured admin token"""
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({
+            "success": False,
+            "error": "Admin endpoints are disabled. Set ADMIN_TOKEN to enable them."
+        }), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({
+            "success": False,
+            "error": "Invalid admin token"
+        }), 401
+
+@admin_bp.route('/profiles', methods=['GET'])
+def list_profiles():
+    """List stored request profiles, newest first"""
+    return jsonify({
+        "success": True,
+        "profiles": profile_store.list()
+    })
+
+@admin_bp.route('/profiles', methods=['DELETE'])
+def clear_profiles():
+    """Drop all stored profiles"""
+    profile_store.clear()
+    return jsonify({"success": True})
+
+@admin_bp.route('/profiles/<int:profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Stage spans and a text report for one profile"""
+    record = profile_store.get(profile_id)
+    if record is None:
+        return jsonify({"success": False, "error": "Profile not found"}), 404
+
+    limit = request.args.get('limit', 30, type=int)
+    return jsonify({
+        "success": True,
+        "profile": record.summary(),
+        "report": record.report(limit)
+    })
+
+@admin_bp.route('/profiles/<int:profile_id>/download', methods=['GET'])
+def download_profile(profile_id):
+    """Raw profile: pstats dump for cProfile, collapsed stacks for sampling"""
+    record = profile_store.get(profile_id)
+    if record is None or record.data is None:
+        return jsonify({"success": False, "error": "Profile not found"}), 404
+
+    payload, filename, mimetype = record.download()
+    return Response(payload, mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename={filename}"
+    })
+
+@admin_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Admission gate state per endpoint (active requests, queue depth, sheds) and static manifest size"""
+    manifest = current_app.extensions.get("static_manifest")
+    return jsonify({
+        "success": True,
+        "admission": admission_controller.stats(),
+        "static": manifest.stats() if manifest is not None else None
+    })
@@ -1,19 +1,33 @@
+import codecs
 import os
 import tempfile
+from bisect import bisect_right
+from itertools import accumulate
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 import PyPDF2
 from docx import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document as LangchainDocument
+from docx.table import Table as DocxTable
 import json
+from langchain.prompts import PromptTemplate
+from src.services import shared_corpus
+from src.services.document_index import PAGE_MARKER, DocumentIndex, SharedDocumentIndex, iter_pages, split_pages
+from src.services.extractive_qa import extractive_answerer, format_answer, should_answer_extractively
+from src.services.profiling import chain_callbacks, span
+from src.services.text_analysis import default_analyzer
 
 document_bp = Blueprint('document', __name__)
 
 # Global variables to store the current document's vector store and metadata
 current_vector_store = None
 current_document_title = None
-current_document_content = None
+current_index = None
+current_qa_chain = None
+current_qa_chain_key = None
+
+# Version of the shared "document" channel this worker's state matches
+shared_document_version = 0
+shared_document_reader = None
 
 # Initialize OpenAI components with proper error handling
 embeddings = None
@@ -61,105 +75,332 @@ ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text_from_pdf(file_path):
-    """Extract text from PDF file"""
-    text = ""
+# Bytes read per step when streaming a TXT file
+TXT_BLOCK_SIZE = 1 << 16
+
+def iter_pdf_pages(file_path):
+    """Yield the text of each PDF page as it is extracted"""
     try:
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
             for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+                yield page.extract_text()
     except Exception as e:
         raise Exception(f"Error reading PDF: {str(e)}")
-    return text
 
-def extract_text_from_docx(file_path):
-    """Extract text from DOCX file"""
+def extract_text_from_pdf(file_path):
+    """Extract text from PDF file"""
+    return "".join(page + "\n" for page in iter_pdf_pages(file_path))
+
+def _table_rows(table):
+    for row in table.rows:
+        cells = []
+        for cell in row.cells:
+            # Merged cells come back once per grid column they span
+            if not cells or cell._tc is not cells[-1]._tc:
+                cells.append(cell)
+        line = " | ".join(cell.text.strip() for cell in cells)
+        if line.strip(" |"):
+            yield line + "\n"
+
+def iter_docx_blocks(file_path):
+    """Yield DOCX paragraphs and table rows, one line each, in document order"""
     try:
         doc = Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        for block in doc.iter_inner_content():
+            if isinstance(block, DocxTable):
+                yield from _table_rows(block)
+            else:
+                yield block.text + "\n"
     except Exception as e:
         raise Exception(f"Error reading DOCX: {str(e)}")
-    return text
 
-def extract_text_from_txt(file_path):
-    """Extract text from TXT file"""
+def extract_text_from_docx(file_path):
+    """Extract text from DOCX file"""
+    return "".join(iter_docx_blocks(file_path))
+
+def iter_txt_blocks(file_path, block_size=TXT_BLOCK_SIZE):
+    """Yield the text of a TXT file in blocks that end at line boundaries.
+
+    Decodes as UTF-8 (with or without a BOM) while it can and as Latin-1 from
+    the first invalid byte on, so the file is read once whatever its encoding.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    tail = ""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            text = file.read()
+        with open(file_path, 'rb') as file:
+            first = True
+            for raw in iter(lambda: file.read(block_size), b''):
+                if first and raw.startswith(codecs.BOM_UTF8):
+                    raw = raw[len(codecs.BOM_UTF8):]
+                first = False
+                text, decoder = _decode_block(decoder, raw)
+                text = tail + text
+                end = text.rfind("\n") + 1
+                if end:
+                    yield text[:end]
+                tail = text[end:]
+            text, _ = _decode_block(decoder, b'', final=True)
     except Exception as e:
-        try:
-            # Try with different encoding
-            with open(file_path, 'r', encoding='latin-1') as file:
-                text = file.read()
-        except Exception as e2:
-            raise Exception(f"Error reading TXT: {str(e2)}")
-    return text
-
-def process_document_text(text, title):
+        raise Exception(f"Error reading TXT: {str(e)}")
+    if tail or text:
+        yield tail + text
+
+def _decode_block(decoder, raw, final=False):
+    """Decode with ``decoder``, switching to Latin-1 at an invalid UTF-8 byte"""
+    try:
+        return decoder.decode(raw, final), decoder
+    except UnicodeDecodeError as e:
+        data = decoder.getstate()[0] + raw
+        fallback = codecs.getincrementaldecoder('latin-1')()
+        return data[:e.start].decode('utf-8') + fallback.decode(data[e.start:], final), fallback
+
+def extract_text_from_txt(file_path):
+    """Extract text from TXT file"""
+    return "".join(iter_txt_blocks(file_path))
+
+def iter_document_pages(file_path, file_extension):
+    """Yield (page number, text) pairs from an uploaded file as it is read"""
+    if file_extension == 'pdf':
+        return enumerate(iter_pdf_pages(file_path), start=1)
+    elif file_extension == 'docx':
+        return iter_pages(iter_docx_blocks(file_path))
+    elif file_extension == 'txt':
+        return iter_pages(iter_txt_blocks(file_path))
+    raise ValueError('Unsupported file type')
+
+def parse_page_numbers(value):
+    """Document page numbers from a form field such as "37-38,41", in order"""
+    numbers = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        first, last = int(first), int(last or first)
+        if first < 1 or last < first:
+            raise ValueError(part)
+        numbers.extend(range(first, last + 1))
+    if not numbers or len(set(numbers)) != len(numbers):
+        raise ValueError(value)
+    return numbers
+
+def read_revision_pages(file_path, file_extension, page_numbers=None):
+    """Pages of a revision file keyed by the document pages they replace.
+
+    File pages (PDF pages, form-feed pages) are mapped in order onto
+    ``page_numbers``; without them the file must carry ``--- Page N ---``
+    markers. Returns (pages, error message).
+    """
+    if page_numbers is not None:
+        texts = [text for _, text in iter_document_pages(file_path, file_extension)]
+        if len(texts) != len(page_numbers):
+            return None, (f"The file has {len(texts)} page(s) but {len(page_numbers)} page number(s) "
+                          f"were given in 'pages'")
+        return dict(zip(page_numbers, texts)), None
+    
+    if file_extension != 'pdf':
+        # Revision files are a few pages, so they are read whole to look for markers
+        blocks = list(iter_docx_blocks(file_path) if file_extension == 'docx' else iter_txt_blocks(file_path))
+        if any(PAGE_MARKER.search(block) for block in blocks):
+            return dict(iter_pages(blocks)), None
+    return None, ("A partial update must say which pages it replaces: give the document page numbers "
+                  "in the 'pages' form field (e.g. \"37-38\") or mark each page with '--- Page N ---'")
+
+# "faiss" keeps float32 vectors and Documents in memory; "quantized" keeps int8
+# vectors in memory and chunk text plus full-precision vectors in mmap'd files
+VECTOR_STORE = os.getenv('VECTOR_STORE', 'faiss').lower()
+VECTOR_STORE_RERANK = os.getenv('VECTOR_STORE_RERANK', 'True').lower() in ('1', 'true', 'yes')
+
+def _faiss_from_documents(documents, embeddings, ids=None):
+    from langchain_community.vectorstores import FAISS
+    return FAISS.from_documents(documents, embeddings, ids=ids)
+
+def _quantized_from_documents(documents, embeddings, ids=None):
+    from src.services.quantized_store import QuantizedVectorStore
+    return QuantizedVectorStore.from_documents(documents, embeddings, ids=ids, rerank=VECTOR_STORE_RERANK)
+
+def vector_store_factory():
+    """The configured constructor for new document vector stores"""
+    return _quantized_from_documents if VECTOR_STORE == 'quantized' else _faiss_from_documents
+
+# Custom prompt to ensure document-only responses; built once, the title is
+# bound per document and the question is passed as a variable
+QA_PROMPT = PromptTemplate.from_template("""You are an AI assistant that answers questions based ONLY on the provided document: "{title}".
+
+IMPORTANT RULES:
+1. Only answer questions using information that is explicitly contained in the provided document
+2. If the information is not in the document, respond with: "That information is not part of this document. Please ask a question based on the uploaded manual."
+3. Do not use any external knowledge or make assumptions
+4. Be specific and cite relevant sections when possible
+5. Keep responses clear and concise
+
+Document excerpts:
+{context}
+
+Question: {question}
+""")
+
+def build_qa_chain(vector_store, title):
+    """Create the retrieval QA chain for a loaded document"""
+    from langchain.chains import RetrievalQA
+    
+    return RetrievalQA.from_chain_type(
+        llm=llm,
+        chain_type="stuff",
+        retriever=vector_store.as_retriever(search_kwargs={"k": 3}),
+        chain_type_kwargs={"prompt": QA_PROMPT.partial(title=title)},
+        return_source_documents=True
+    )
+
+def get_qa_chain():
+    """Return the cached QA chain, rebuilding it only when the document changes"""
+    global current_qa_chain, current_qa_chain_key
+    
+    # Incremental updates mutate the vector store in place, so the chain stays valid
+    key = (id(current_vector_store), id(llm), current_document_title)
+    if current_qa_chain is None or current_qa_chain_key != key:
+        current_qa_chain = build_qa_chain(current_vector_store, current_document_title)
+        current_qa_chain_key = key
+    return current_qa_chain
+
+def build_document_index(pages, title):
+    """Chunk, and in vector mode embed, a document into a new DocumentIndex.
+
+    ``pages`` is a page mapping or a stream of (number, text) pairs; streamed
+    pages are chunked as they are extracted.
+    """
+    vector_mode = not simple_mode and embeddings is not None and llm is not None
+    
+    # Chunk page by page so later revisions only touch the pages they change
+    index = DocumentIndex(
+        title,
+        embeddings=embeddings if vector_mode else None,
+        vector_store_factory=vector_store_factory(),
+    )
+    index.build(pages)
+    return index
+
+def activate_document(index):
+    """Make ``index`` the current document, returning its chunk count"""
+    global current_vector_store, current_document_title, current_index
+    
+    vector_mode = index.embeddings is not None
+    
+    # Store globally
+    current_index = index
+    current_document_title = index.title
+    # In simple mode the flag just indicates a document is loaded
+    current_vector_store = index.vector_store if vector_mode else "simple_mode"
+    
+    if vector_mode and current_vector_store is not None:
+        get_qa_chain()
+    
+    return len(index)
+
+def process_document_text(text, title, pages=None):
     """Process document text into vector store or simple storage"""
-    global current_vector_store, current_document_title, current_document_content
+    index = build_document_index(pages or split_pages(text), title)
+    return activate_document(index)
+
+def publish_current_document():
+    """Share the current document with the other worker processes"""
+    global shared_document_version
     
-    if simple_mode or not embeddings or not llm:
-        # Simple mode - just store the text
-        current_document_content = text
-        current_document_title = title
-        current_vector_store = "simple_mode"  # Flag to indicate document is loaded
-        
-        # Split into chunks for better searching
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
+    if not shared_corpus.is_enabled():
+        return
+    try:
+        vector_bytes = None
+        store = current_index.vector_store if current_index else None
+        if store is not None and hasattr(store, 'serialize_to_bytes'):
+            vector_bytes = store.serialize_to_bytes()
+        shared_document_version = shared_corpus.publish_document(
+            current_document_title,
+            current_index.pages if current_index else {},
+            current_index.ordered_chunks() if current_index else [],
+            vector_bytes,
         )
-        
-        chunks = text_splitter.split_text(text)
-        return len(chunks)
+    except Exception as e:
+        print(f"Warning: could not publish document to shared memory: {e}")
+
+def _vector_store_from_bytes(data):
+    if VECTOR_STORE == 'quantized':
+        from src.services.quantized_store import QuantizedVectorStore
+        return QuantizedVectorStore.deserialize_from_bytes(data, embeddings)
+    from langchain_community.vectorstores import FAISS
+    # Only ever bytes this application serialized itself
+    return FAISS.deserialize_from_bytes(data, embeddings, allow_dangerous_deserialization=True)
+
+@document_bp.before_request
+def sync_shared_document():
+    """Pick up a document uploaded, updated or cleared in another worker"""
+    global shared_document_reader, shared_document_version
+    global current_vector_store, current_document_title, current_index
     
-    else:
-        # Full vector mode
-        from langchain_community.vectorstores import FAISS
-        
-        # Split text into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-        )
+    if not shared_corpus.is_enabled():
+        return
+    try:
+        if shared_document_reader is None:
+            shared_document_reader = shared_corpus.SharedCorpusReader("document")
+        shared_document_reader.poll()
+        if shared_document_reader.version in (0, shared_document_version):
+            return
         
-        # Create documents
-        documents = [LangchainDocument(page_content=text, metadata={"source": title})]
-        texts = text_splitter.split_documents(documents)
+        segment = shared_document_reader.segment
+        shared_document_version = shared_document_reader.version
+        if not segment.meta["loaded"]:
+            current_vector_store = None
+            current_document_title = None
+            current_index = None
+            return
         
-        # Create vector store
-        vector_store = FAISS.from_documents(texts, embeddings)
+        title, pages, chunks = shared_corpus.document_from_segment(segment)
+        vector_mode = not simple_mode and embeddings is not None and llm is not None
+        if vector_mode and segment.has_blob("vector_store"):
+            # Pages and chunks are read from the segment, not copied
+            index = SharedDocumentIndex(
+                title, pages, chunks,
+                embeddings=embeddings,
+                vector_store=_vector_store_from_bytes(segment.blob("vector_store")),
+            )
+        elif vector_mode:
+            # Published without vectors (store could not be serialized): embed here
+            index = build_document_index(dict(pages.items()), title)
+        else:
+            index = SharedDocumentIndex(title, pages, chunks)
         
-        # Store globally
-        current_vector_store = vector_store
+        current_index = index
         current_document_title = title
-        current_document_content = text
-        
-        return len(texts)
+        current_vector_store = index.vector_store if vector_mode else "simple_mode"
+    except Exception as e:
+        print(f"Warning: could not load shared document: {e}")
 
-def simple_search(query, text, max_results=3):
-    """Simple text search when vector search is not available"""
-    query_lower = query.lower()
-    text_lower = text.lower()
-    
-    # Split text into sentences
-    sentences = text.split('.')
+def simple_search(query, texts, max_results=3):
+    """Simple text search when vector search is not available
+
+    ``texts`` is the document text, or its pages one at a time.
+    """
+    query_terms = default_analyzer.analyze_query(query)
+    if not query_terms:
+        return []
+    if isinstance(texts, str):
+        texts = (texts,)
     
-    # Find sentences containing query terms
     relevant_sentences = []
-    query_words = query_lower.split()
-    
-    for sentence in sentences:
-        sentence_lower = sentence.lower()
-        score = sum(1 for word in query_words if word in sentence_lower)
-        if score > 0:
-            relevant_sentences.append((sentence.strip(), score))
+    for text in texts:
+        # Split text into sentences, remembering where each one starts
+        sentences = text.split('.')
+        starts = list(accumulate((len(sentence) + 1 for sentence in sentences), initial=0))
+        
+        # Find sentences containing query terms in a single pass over the text
+        matched_terms = {}
+        for offset, term in default_analyzer.find_terms(text, query_terms):
+            matched_terms.setdefault(bisect_right(starts, offset) - 1, set()).add(term)
+        
+        relevant_sentences.extend(
+            (sentences[index].strip(), len(terms))
+            for index, terms in sorted(matched_terms.items())
+        )
     
     # Sort by relevance and return top results
     relevant_sentences.sort(key=lambda x: x[1], reverse=True)
@@ -189,31 +430,28 @@ def upload_document():
             # Extract text based on file type
             file_extension = filename.rsplit('.', 1)[1].lower()
             
-            if file_extension == 'pdf':
-                text = extract_text_from_pdf(file_path)
-            elif file_extension == 'docx':
-                text = extract_text_from_docx(file_path)
-            elif file_extension == 'txt':
-                text = extract_text_from_txt(file_path)
-            else:
+            if file_extension not in ALLOWED_EXTENSIONS:
                 return jsonify({'error': 'Unsupported file type'}), 400
             
+            # Process the document, chunking pages as they are extracted
+            title = filename.rsplit('.', 1)[0]  # Remove extension for title
+            index = build_document_index(iter_document_pages(file_path, file_extension), title)
+            
             # Clean up temporary file
             os.remove(file_path)
             os.rmdir(temp_dir)
             
-            if not text.strip():
+            if not any(page.strip() for page in index.pages.values()):
                 return jsonify({'error': 'No text could be extracted from the document'}), 400
             
-            # Process the document
-            title = filename.rsplit('.', 1)[0]  # Remove extension for title
-            chunk_count = process_document_text(text, title)
+            chunk_count = activate_document(index)
+            publish_current_document()
             
             return jsonify({
                 'success': True,
                 'title': title,
                 'chunk_count': chunk_count,
-                'text_length': len(text),
+                'text_length': sum(len(page) for page in index.page_texts()),
                 'message': f'Document "{title}" processed successfully',
                 'mode': 'simple' if simple_mode else 'vector'
             })
@@ -232,8 +470,6 @@ def upload_document():
 @document_bp.route('/query', methods=['POST'])
 def query_document():
     """Query the processed document"""
-    global current_vector_store, current_document_title, current_document_content
-    
     try:
         if not current_vector_store:
             return jsonify({'error': 'No document has been uploaded and processed'}), 400
@@ -246,9 +482,27 @@ def query_document():
         if not question:
             return jsonify({'error': 'Question cannot be empty'}), 400
         
-        if simple_mode or current_vector_store == "simple_mode":
-            # Simple text search mode
-            relevant_text = simple_search(question, current_document_content)
+        # Best lexical matches, scored sentence by sentence without the LLM
+        with span("lexical_search"):
+            candidates = current_index.search(question, max_chunks=8) if current_index else []
+        with span("extractive"):
+            extractive = extractive_answerer.answer(
+                question, [(chunk["id"], chunk["text"]) for chunk in candidates])
+        
+        simple = simple_mode or current_vector_store == "simple_mode"
+        if should_answer_extractively(extractive, not simple and llm is not None):
+            return jsonify({
+                'success': True,
+                'answer': format_answer(extractive, f"the document '{current_document_title}'"),
+                'document_title': current_document_title,
+                'confidence': extractive['confidence'],
+                'mode': 'extractive'
+            })
+        
+        if simple:
+            # Simple text search mode over the whole text when nothing matched
+            with span("simple_search"):
+                relevant_text = simple_search(question, current_index.page_texts() if current_index else ())
             
             if relevant_text:
                 answer = f"Based on the document '{current_document_title}', here are the relevant sections:\n\n"
@@ -268,32 +522,12 @@ def query_document():
             if not llm:
                 return jsonify({'error': 'AI services not available'}), 500
             
-            from langchain.chains import RetrievalQA
-            
-            # Create retrieval QA chain
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=llm,
-                chain_type="stuff",
-                retriever=current_vector_store.as_retriever(search_kwargs={"k": 3}),
-                return_source_documents=True
-            )
-            
-            # Custom prompt to ensure document-only responses
-            custom_prompt = f"""
-            You are an AI assistant that answers questions based ONLY on the provided document: "{current_document_title}".
+            with span("chain_build"):
+                qa_chain = get_qa_chain()
             
-            IMPORTANT RULES:
-            1. Only answer questions using information that is explicitly contained in the provided document
-            2. If the information is not in the document, respond with: "That information is not part of this document. Please ask a question based on the uploaded manual."
-            3. Do not use any external knowledge or make assumptions
-            4. Be specific and cite relevant sections when possible
-            5. Keep responses clear and concise
-            
-            Question: {question}
-            """
-            
-            # Get response
-            result = qa_chain({"query": custom_prompt})
+            # Get response; only the question itself is embedded for retrieval
+            with span("qa_chain"):
+                result = qa_chain.invoke({"query": question}, config={"callbacks": chain_callbacks()})
             answer = result['result']
             
             # Check if the answer indicates information not found
@@ -316,11 +550,90 @@ def query_document():
     except Exception as e:
         return jsonify({'error': f'Error processing query: {str(e)}'}), 500
 
+@document_bp.route('/update', methods=['POST'])
+def update_document():
+    """Apply a revised version of the current document page by page.
+
+    Accepts either a file upload (the complete new version, or only the
+    revision pages when the form field ``partial`` is true) or JSON of the form
+    ``{"pages": {"12": "new text"}, "removed_pages": [13]}``. A partial file
+    names the pages it replaces in the form field ``pages`` ("37-38", in file
+    page order) or with ``--- Page N ---`` markers. Only pages whose content
+    changed are re-chunked and re-embedded.
+    """
+    global current_vector_store, current_index
+    
+    try:
+        if current_index is None:
+            return jsonify({'error': 'No document has been uploaded and processed'}), 400
+        if isinstance(current_index, SharedDocumentIndex):
+            # Published by another worker: take a private copy to update
+            current_index = current_index.to_document_index(vector_store_factory())
+        
+        if 'file' in request.files:
+            file = request.files['file']
+            if file.filename == '' or not allowed_file(file.filename):
+                return jsonify({'error': 'File type not allowed. Please upload PDF, DOCX, or TXT files.'}), 400
+            
+            partial = request.form.get('partial', '').lower() in ('1', 'true', 'yes')
+            page_numbers = None
+            if partial and request.form.get('pages'):
+                try:
+                    page_numbers = parse_page_numbers(request.form['pages'])
+                except ValueError:
+                    return jsonify({'error': "'pages' must list distinct page numbers, e.g. \"37-38,41\""}), 400
+            
+            filename = secure_filename(file.filename)
+            file_extension = filename.rsplit('.', 1)[1].lower()
+            temp_dir = tempfile.mkdtemp()
+            file_path = os.path.join(temp_dir, filename)
+            file.save(file_path)
+            try:
+                if partial:
+                    pages, error = read_revision_pages(file_path, file_extension, page_numbers)
+                else:
+                    pages, error = dict(iter_document_pages(file_path, file_extension)), None
+            finally:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                os.rmdir(temp_dir)
+            if error:
+                return jsonify({'error': error}), 400
+            
+            summary = current_index.update_pages(pages, replace_all=not partial)
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict) or ('pages' not in data and 'removed_pages' not in data):
+                return jsonify({'error': 'No pages provided'}), 400
+            new_pages = data.get('pages') or {}
+            removed = data.get('removed_pages') or []
+            if not isinstance(new_pages, dict) or not all(isinstance(text, str) for text in new_pages.values()):
+                return jsonify({'error': "'pages' must map page numbers to page text"}), 400
+            if not isinstance(removed, list):
+                return jsonify({'error': "'removed_pages' must be a list of page numbers"}), 400
+            try:
+                pages = {int(number): text for number, text in new_pages.items()}
+                removed_pages = [int(number) for number in removed]
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Page numbers must be integers'}), 400
+            summary = current_index.update_pages(pages, removed_pages=removed_pages)
+        
+        if current_vector_store != "simple_mode":
+            current_vector_store = current_index.vector_store
+        publish_current_document()
+        
+        return jsonify({
+            'success': True,
+            'document_title': current_document_title,
+            **summary
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Error updating document: {str(e)}'}), 500
+
 @document_bp.route('/status', methods=['GET'])
 def get_status():
     """Get current document processing status"""
-    global current_document_title, current_vector_store
-    
     return jsonify({
         'has_document': current_vector_store is not None,
         'document_title': current_document_title,
@@ -332,11 +645,13 @@ def get_status():
 @document_bp.route('/clear', methods=['POST'])
 def clear_document():
     """Clear the current document and reset the system"""
-    global current_vector_store, current_document_title, current_document_content
+    global current_vector_store, current_document_title, current_index, current_qa_chain
     
     current_vector_store = None
     current_document_title = None
-    current_document_content = None
+    current_index = None
+    current_qa_chain = None
+    publish_current_document()
     
     return jsonify({
         'success': True,
@@ -4,6 +4,7 @@ Handles POH document information and Q&A functionality
 """
 
 from flask import Blueprint, request, jsonify
+from src.services.conversation import session_store
 from src.services.poh_qa import poh_qa_service
 
 poh_bp = Blueprint('poh', __name__)
@@ -41,15 +42,20 @@ def ask_question():
                 "error": "Question cannot be empty"
             }), 400
         
+        # Follow-up questions reuse the session's history and retrieved chunks;
+        # without a (live) session_id a new session is started
+        session = session_store.get_or_create(data.get('session_id'))
+        
         # Generate answer
-        result = poh_qa_service.generate_answer(question)
+        result = poh_qa_service.generate_answer(question, session)
         
         return jsonify({
             "success": True,
             "question": question,
             "answer": result["answer"],
             "source": result["source"],
-            "confidence": result["confidence"]
+            "confidence": result["confidence"],
+            "session_id": session.id
         })
         
     except Exception as e:
@@ -58,6 +64,20 @@ def ask_question():
             "error": str(e)
         }), 500
 
+@poh_bp.route('/session/<session_id>', methods=['DELETE'])
+def end_session(session_id):
+    """Forget a conversation's history and cached chunks"""
+    try:
+        return jsonify({
+            "success": True,
+            "ended": session_store.end(session_id)
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @poh_bp.route('/samples', methods=['GET'])
 def get_sample_questions():
     """Get sample questions for testing"""
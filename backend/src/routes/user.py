@@ -1,26 +1,174 @@
+from urllib.parse import urlencode
+
 from flask import Blueprint, jsonify, request
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
 
 user_bp = Blueprint('user', __name__)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BULK_USERS = 5000
+
+
+def parse_fields(default=User.FIELDS):
+    """Columns named by ?fields=id,username (all of them when absent)"""
+    raw = request.args.get('fields')
+    if not raw:
+        return default, None
+    fields = tuple(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in User.FIELDS]
+    if unknown or not fields:
+        return None, f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(User.FIELDS)}"
+    return fields, None
+
+
+def _int_arg(name, default):
+    value = request.args.get(name, default)
+    try:
+        return int(value), None
+    except (TypeError, ValueError):
+        return None, f"'{name}' must be an integer"
+
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """Users in id order, one page at a time.
+
+    ``?limit=`` (default 100, at most 1000) and ``?after=<id>`` page through
+    the table by primary key (keyset pagination, so every page costs the
+    same); the cursor for the next page is in the X-Next-Cursor and Link
+    headers. ``?fields=`` selects columns.
+    """
+    fields, error = parse_fields()
+    limit, limit_error = _int_arg('limit', DEFAULT_PAGE_SIZE)
+    after, after_error = _int_arg('after', 0)
+    error = error or limit_error or after_error
+    if error:
+        return jsonify({'error': error}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    # Plain column rows, no ORM objects; id is always read for the cursor
+    columns = [User.id] + [getattr(User, field) for field in fields if field != 'id']
+    rows = db.session.execute(
+        select(*columns).where(User.id > after).order_by(User.id).limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = jsonify([{field: row._mapping[field] for field in fields} for row in rows])
+    if has_more:
+        cursor = rows[-1].id
+        response.headers['X-Next-Cursor'] = str(cursor)
+        query = urlencode({**request.args.to_dict(), 'after': cursor, 'limit': limit})
+        response.headers['Link'] = f'<{request.base_url}?{query}>; rel="next"'
+    return response
+
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
-    
+
     data = request.json
     user = User(username=data['username'], email=data['email'])
     db.session.add(user)
     db.session.commit()
     return jsonify(user.to_dict()), 201
 
+
+def _bulk_payload():
+    """The list of user objects of a bulk request, or an error message"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('users')
+    if not isinstance(data, list) or not data:
+        return None, "Expected a non-empty list of users (or {\"users\": [...]})"
+    if len(data) > MAX_BULK_USERS:
+        return None, f"At most {MAX_BULK_USERS} users per request"
+    if not all(isinstance(item, dict) for item in data):
+        return None, "Every user must be an object"
+    return data, None
+
+
+def _bulk_fields(item, position, required):
+    """The username/email of one bulk item, or an error message naming it"""
+    fields = {}
+    for field in ('username', 'email'):
+        if field not in item:
+            if required:
+                return None, f"User {position} needs a username and an email"
+            continue
+        value = item[field]
+        if not isinstance(value, str) or not value.strip():
+            return None, f"User {position}: '{field}' must be a non-empty string"
+        fields[field] = value
+    return fields, None
+
+
+@user_bp.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
+    """Create many users in one transaction; all or none are created"""
+    users, error = _bulk_payload()
+    if error:
+        return jsonify({'error': error}), 400
+    rows = []
+    for position, item in enumerate(users):
+        row, error = _bulk_fields(item, position, required=True)
+        if error:
+            return jsonify({'error': error}), 400
+        rows.append(row)
+
+    try:
+        ids = db.session.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), rows).all()
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify({'error': f"Duplicate username or email, nothing was created: {e.orig}"}), 409
+
+    return jsonify([{'id': user_id, **row} for user_id, row in zip(ids, rows)]), 201
+
+
+@user_bp.route('/users/bulk', methods=['PATCH'])
+def bulk_update_users():
+    """Update many users by id in one transaction; all or none are updated"""
+    users, error = _bulk_payload()
+    if error:
+        return jsonify({'error': error}), 400
+    rows = []
+    for position, item in enumerate(users):
+        if not isinstance(item.get('id'), int) or isinstance(item['id'], bool):
+            return jsonify({'error': f"User {position} needs an integer id"}), 400
+        changes, error = _bulk_fields(item, position, required=False)
+        if error:
+            return jsonify({'error': error}), 400
+        if changes:
+            rows.append({'id': item['id'], **changes})
+    if not rows:
+        return jsonify({'updated': 0})
+
+    ids = [row['id'] for row in rows]
+    found = set(db.session.scalars(select(User.id).where(User.id.in_(ids))))
+    missing = [user_id for user_id in ids if user_id not in found]
+    if missing:
+        return jsonify({'error': f"Users not found: {missing[:20]}"}), 404
+
+    try:
+        # Statements are grouped by the set of columns each row changes
+        db.session.execute(update(User), rows)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify({'error': f"Duplicate username or email, nothing was updated: {e.orig}"}), 409
+    return jsonify({'updated': len(rows)})
+
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
+    fields, error = parse_fields()
+    if error:
+        return jsonify({'error': error}), 400
     user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict())
+    return jsonify(user.to_dict(fields))
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
@@ -0,0 +1,219 @@
+"""
+Admission Control
+Per-endpoint concurrency limits and load shedding for expensive endpoints.
+
+Each limited endpoint has a gate: a fixed number of requests run at once and
+a bounded FIFO queue waits for a slot until its deadline. Requests that find
+the queue full get 429 and requests whose deadline passes get 503, both with
+Retry-After, so a burst of uploads or audio cannot tie up every worker
+thread or the memory behind them. Request bodies over the endpoint's limit
+are refused with 413 from the Content-Length header, before anything reads
+or decodes them. Endpoints without a gate (health checks, info) are never
+queued.
+
+Gates live in the process, so limits apply per worker and only bite when a
+worker serves requests on several threads (gunicorn.conf.py uses gthread
+workers). A queued request holds its worker thread while it waits.
+
+Gate counters and queue depths are served at /api/admin/metrics.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from flask import g, jsonify, request
+
+# endpoint -> limits; max_body_bytes None means no size limit
+DEFAULT_LIMITS = {
+    "document.upload_document": {
+        "max_concurrent": 2, "max_queue": 4, "queue_timeout": 10.0, "max_body_bytes": 50 * 1024 * 1024,
+    },
+    "document.update_document": {
+        "max_concurrent": 2, "max_queue": 4, "queue_timeout": 10.0, "max_body_bytes": 50 * 1024 * 1024,
+    },
+    # Whisper accepts up to 25 MB of audio, which is about 34 MB as base64 JSON
+    "voice.transcribe_audio": {
+        "max_concurrent": 4, "max_queue": 8, "queue_timeout": 10.0, "max_body_bytes": 35 * 1024 * 1024,
+    },
+    "poh.ask_question": {
+        "max_concurrent": 8, "max_queue": 32, "queue_timeout": 15.0, "max_body_bytes": 64 * 1024,
+    },
+    "document.query_document": {
+        "max_concurrent": 8, "max_queue": 32, "queue_timeout": 15.0, "max_body_bytes": 64 * 1024,
+    },
+}
+
+MAX_RETRY_AFTER = 60
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionGate:
+    """Concurrency limit with a bounded FIFO wait queue"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int = 0,
+                 queue_timeout: float = 10.0, max_body_bytes: Optional[int] = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_body_bytes = max_body_bytes
+
+        self.active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        # Moving average of how long an admitted request holds its slot
+        self.service_time = 0.0
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0, "too_large": 0}
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def enter(self) -> Optional[str]:
+        """Take a slot, waiting in the queue if needed.
+
+        Returns None once admitted, otherwise "queue_full" or "timeout".
+        """
+        with self._lock:
+            if self.active < self.max_concurrent and not self._waiters:
+                self.active += 1
+                self.counters["admitted"] += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self.counters["rejected"] += 1
+                return "queue_full"
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+            self.counters["queued"] += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+
+        waiter.event.wait(self.queue_timeout)
+        with self._lock:
+            # A slot may have been handed over just as the wait timed out
+            if waiter.granted:
+                self.counters["admitted"] += 1
+                return None
+            self._waiters.remove(waiter)
+            self.counters["timed_out"] += 1
+            return "timeout"
+
+    def leave(self, held_for: float = 0.0):
+        """Release a slot, handing it straight to the oldest waiter"""
+        with self._lock:
+            self.service_time = held_for if not self.service_time else 0.8 * self.service_time + 0.2 * held_for
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                self.active -= 1
+
+    def count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is likely to have drained"""
+        with self._lock:
+            backlog = len(self._waiters) + self.active
+        estimate = self.service_time * backlog / max(self.max_concurrent, 1)
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "active": self.active,
+                "queue_depth": len(self._waiters),
+                "max_queue_depth": self.max_queue_depth,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "max_body_bytes": self.max_body_bytes,
+                "avg_service_seconds": round(self.service_time, 4),
+                **self.counters,
+            }
+
+
+class AdmissionController:
+    """The gates of one application, keyed by endpoint name"""
+
+    def __init__(self):
+        self.gates: Dict[str, AdmissionGate] = {}
+
+    def configure(self, limits: Dict[str, Dict]):
+        self.gates = {endpoint: AdmissionGate(endpoint, **settings) for endpoint, settings in limits.items()}
+
+    def stats(self) -> Dict:
+        return {endpoint: gate.stats() for endpoint, gate in self.gates.items()}
+
+
+admission_controller = AdmissionController()
+
+
+def _env_flag(name: str, default: str = "True") -> bool:
+    return os.environ.get(name, default).lower() in ("1", "true", "yes")
+
+
+def _shed(status: int, error: str, retry_after: Optional[int] = None):
+    response = jsonify({"success": False, "error": error})
+    response.status_code = status
+    if retry_after is not None:
+        response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def init_admission(app):
+    """Register the admission hooks on ``app``.
+
+    Limits come from DEFAULT_LIMITS, updated per endpoint by
+    ``app.config["ADMISSION_LIMITS"]``; ADMISSION_CONTROL=False turns the
+    layer off.
+    """
+    app.config.setdefault("ADMISSION_CONTROL", _env_flag("ADMISSION_CONTROL"))
+    app.config.setdefault("ADMISSION_LIMITS", {})
+    if not app.config["ADMISSION_CONTROL"]:
+        return
+
+    limits = {endpoint: dict(settings) for endpoint, settings in DEFAULT_LIMITS.items()}
+    for endpoint, settings in app.config["ADMISSION_LIMITS"].items():
+        limits.setdefault(endpoint, {}).update(settings)
+    admission_controller.configure(limits)
+
+    @app.before_request
+    def admit_request():
+        gate = admission_controller.gates.get(request.endpoint)
+        if gate is None:
+            return
+
+        if gate.max_body_bytes is not None:
+            if request.content_length is not None and request.content_length > gate.max_body_bytes:
+                gate.count("too_large")
+                return _shed(413, f"Request body exceeds {gate.max_body_bytes} bytes")
+            # Chunked uploads have no Content-Length; cap what may be read
+            request.max_content_length = gate.max_body_bytes
+
+        outcome = gate.enter()
+        if outcome == "queue_full":
+            return _shed(429, "Too many requests for this endpoint, please retry later", gate.retry_after())
+        if outcome == "timeout":
+            return _shed(503, "Server is busy, please retry later", gate.retry_after())
+        g.admission_gate = gate
+        g.admission_start = time.perf_counter()
+
+    @app.teardown_request
+    def release_slot(exc):
+        gate = g.pop("admission_gate", None)
+        if gate is not None:
+            gate.leave(time.perf_counter() - g.pop("admission_start"))
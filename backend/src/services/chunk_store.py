@@ -0,0 +1,196 @@
+"""
+Chunk Store
+Column-oriented storage for a static list of text chunks.
+
+Loading chunks from JSON gives one dict per chunk, a nested metadata dict
+and a copy of the same source string in each. ChunkStore keeps the same
+data as parallel arrays instead: offsets into one UTF-8 text buffer (and one
+id buffer), page numbers, section ids and an interned source table. Callers
+get ChunkView objects, ``__slots__`` views that read the columns on access
+and still answer ``chunk["text"]`` and friends like the old dicts.
+"""
+
+import json
+import re
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, Iterator, List, Optional
+
+PAGE_MARKER = re.compile(r"--- Page (\d+) ---")
+
+# Metadata keys that have a column of their own
+COLUMN_KEYS = frozenset(("source", "chunk_index", "page", "section"))
+
+
+class ChunkView(Mapping):
+    """One row of a ChunkStore"""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "ChunkStore", row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def id(self) -> str:
+        return self._store.id_at(self._row)
+
+    @property
+    def text(self) -> str:
+        return self._store.text_at(self._row)
+
+    @property
+    def page(self) -> Optional[int]:
+        page = self._store.pages[self._row]
+        return page if page >= 0 else None
+
+    @property
+    def section(self) -> Optional[int]:
+        section = self._store.sections[self._row]
+        return section if section >= 0 else None
+
+    @property
+    def section_title(self) -> Optional[str]:
+        section = self.section
+        return None if section is None else self._store.section_titles[section]
+
+    @property
+    def source(self) -> str:
+        return self._store.source_table[self._store.sources[self._row]]
+
+    @property
+    def metadata(self) -> Dict:
+        store, row = self._store, self._row
+        metadata = {"source": self.source, "chunk_index": store.chunk_indexes[row]}
+        if self.page is not None:
+            metadata["page"] = self.page
+        if self.section is not None:
+            metadata["section"] = self.section
+        metadata.update(store.extra_metadata.get(row, ()))
+        return metadata
+
+    def __getitem__(self, key):
+        if key == "text":
+            return self.text
+        if key == "id":
+            return self.id
+        if key == "metadata":
+            return self.metadata
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("id", "text", "metadata"))
+
+    def __len__(self) -> int:
+        return 3
+
+    def __repr__(self) -> str:
+        return f"ChunkView({self.id!r}, page={self.page})"
+
+
+class ChunkStore(Sequence):
+    """Immutable chunk table, built once with ``from_dicts``"""
+
+    def __init__(self):
+        self.text_buffer = b""
+        self.text_offsets = array("q", [0])
+        self.id_buffer = b""
+        self.id_offsets = array("q", [0])
+        self.pages = array("i")
+        self.sections = array("i")
+        self.chunk_indexes = array("i")
+        self.sources = array("H")
+        self.source_table: List[str] = []
+        self.section_titles: List[str] = []
+        # Metadata keys other than the column ones, for the rare chunk that has them
+        self.extra_metadata: Dict[int, Dict] = {}
+
+    @classmethod
+    def from_dicts(cls, chunks: Iterable[Dict], sections: Optional[List[Dict]] = None) -> "ChunkStore":
+        """Build from ``{"id", "text", "metadata"}`` dicts.
+
+        ``sections`` is the POH section list (``{"title", "page"}`` in page
+        order); each chunk gets the id of the last section starting on or
+        before its page. A chunk's page is the page it starts on, taken from
+        the ``--- Page N ---`` markers in the text.
+        """
+        store = cls()
+        sections = sections or []
+        section_pages = [section["page"] for section in sections]
+        store.section_titles = [section["title"] for section in sections]
+        source_ids: Dict[str, int] = {}
+        texts, ids = [], []
+        text_end = id_end = 0
+        current_page = -1
+
+        for row, chunk in enumerate(chunks):
+            text = chunk["text"].encode("utf-8")
+            chunk_id = str(chunk.get("id", row)).encode("utf-8")
+            texts.append(text)
+            ids.append(chunk_id)
+            text_end += len(text)
+            id_end += len(chunk_id)
+            store.text_offsets.append(text_end)
+            store.id_offsets.append(id_end)
+
+            metadata = chunk.get("metadata") or {}
+            markers = PAGE_MARKER.findall(chunk["text"])
+            page = metadata.get("page")
+            if page is None:
+                page = int(markers[0]) if markers and chunk["text"].startswith("--- Page") else current_page
+            if markers:
+                current_page = int(markers[-1])
+            store.pages.append(page)
+            store.sections.append(bisect_right(section_pages, page) - 1 if page >= 0 else -1)
+            store.chunk_indexes.append(metadata.get("chunk_index", row))
+
+            source = metadata.get("source", "")
+            if source not in source_ids:
+                source_ids[source] = len(store.source_table)
+                store.source_table.append(source)
+            store.sources.append(source_ids[source])
+
+            extra = {key: value for key, value in metadata.items() if key not in COLUMN_KEYS}
+            if extra:
+                store.extra_metadata[row] = extra
+
+        store.text_buffer = b"".join(texts)
+        store.id_buffer = b"".join(ids)
+        return store
+
+    @classmethod
+    def from_json_file(cls, path: str, sections: Optional[List[Dict]] = None) -> "ChunkStore":
+        with open(path, 'r') as f:
+            return cls.from_dicts(json.load(f), sections)
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return ChunkView(self, index)
+
+    def text_at(self, row: int) -> str:
+        return self.text_buffer[self.text_offsets[row]:self.text_offsets[row + 1]].decode("utf-8")
+
+    def id_at(self, row: int) -> str:
+        return self.id_buffer[self.id_offsets[row]:self.id_offsets[row + 1]].decode("utf-8")
+
+    def texts(self) -> Iterator[str]:
+        """All chunk texts in order, without creating views"""
+        for row in range(len(self)):
+            yield self.text_at(row)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the buffers and columns (excluding the small tables)"""
+        columns = (self.text_offsets, self.id_offsets, self.pages, self.sections,
+                   self.chunk_indexes, self.sources)
+        return (len(self.text_buffer) + len(self.id_buffer)
+                + sum(column.itemsize * len(column) for column in columns))
@@ -0,0 +1,163 @@
+"""
+Conversation Sessions
+Per-session memory for follow-up questions to the POH assistant.
+
+A session keeps its last few turns and the chunks recently retrieved for it.
+A follow-up ("and what about landing?") is searched within that candidate
+set first, which is a handful of dict probes instead of a full index search;
+only when the candidates do not cover the new question is the whole index
+searched (with the previous question as context) and the candidates extended.
+The LLM prompt gets as many of the latest turns as fit a token budget.
+
+Sessions live in process memory, bounded in number (least recently used
+evicted) and dropped after SESSION_IDLE_SECONDS without a question. Under
+several gunicorn workers a follow-up that reaches another worker starts a
+new session.
+"""
+
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+SESSION_IDLE_SECONDS = float(os.environ.get("SESSION_IDLE_SECONDS", "1800"))
+SESSION_MAX_SESSIONS = int(os.environ.get("SESSION_MAX_SESSIONS", "1000"))
+SESSION_MAX_TURNS = 6
+SESSION_MAX_CANDIDATES = 40
+# Tokens of prior turns included in the LLM prompt (about 4 characters each)
+SESSION_HISTORY_TOKENS = int(os.environ.get("SESSION_HISTORY_TOKENS", "400"))
+CHARS_PER_TOKEN = 4
+# Stored answers are cut to this; the history never needs more
+MAX_STORED_ANSWER = 800
+
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+# Openings and pronouns that lean on the previous question
+FOLLOW_UP_START = re.compile(r"^\s*(?:and|also|what about|how about|then|but|so|same|ok(?:ay)?,? (?:and|what))\b",
+                             re.IGNORECASE)
+FOLLOW_UP_WORDS = frozenset("it its it's that those them they this these there one ones".split())
+
+
+class Turn:
+    __slots__ = ("question", "answer")
+
+    def __init__(self, question: str, answer: str):
+        self.question = question
+        self.answer = answer
+
+
+class ConversationSession:
+    """Recent turns and retrieved chunk positions of one conversation"""
+
+    __slots__ = ("id", "turns", "candidates", "corpus", "last_used", "lock")
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.turns: deque = deque(maxlen=SESSION_MAX_TURNS)
+        # Chunk positions, most recently retrieved last
+        self.candidates: "OrderedDict[int, None]" = OrderedDict()
+        # The chunk list the positions refer to
+        self.corpus = None
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def previous_question(self) -> Optional[str]:
+        return self.turns[-1].question if self.turns else None
+
+    def is_follow_up(self, question: str) -> bool:
+        """Whether ``question`` depends on the conversation so far"""
+        if not self.turns:
+            return False
+        if FOLLOW_UP_START.match(question):
+            return True
+        words = re.findall(r"[a-z']+", question.lower())
+        return len(words) <= 8 and any(word in FOLLOW_UP_WORDS for word in words)
+
+    def candidate_positions(self, corpus) -> List[int]:
+        """Cached chunk positions, or none if they belong to another chunk list"""
+        if self.corpus is not corpus:
+            self.candidates.clear()
+            self.corpus = corpus
+        return list(self.candidates)
+
+    def remember_chunks(self, corpus, positions):
+        if self.corpus is not corpus:
+            self.candidates.clear()
+            self.corpus = corpus
+        for position in positions:
+            self.candidates[position] = None
+            self.candidates.move_to_end(position)
+        while len(self.candidates) > SESSION_MAX_CANDIDATES:
+            self.candidates.popitem(last=False)
+
+    def add_turn(self, question: str, answer: str):
+        if len(answer) > MAX_STORED_ANSWER:
+            answer = answer[:MAX_STORED_ANSWER].rsplit(" ", 1)[0] + " ..."
+        self.turns.append(Turn(question, answer))
+
+    def history_messages(self, token_budget: int = SESSION_HISTORY_TOKENS) -> List[Dict]:
+        """Chat messages for the prior turns, oldest first, within ``token_budget``"""
+        budget = token_budget * CHARS_PER_TOKEN
+        messages = []
+        for turn in reversed(self.turns):
+            cost = len(turn.question) + len(turn.answer)
+            if cost > budget:
+                # The newest turn that does not fit is kept with a shortened answer
+                room = budget - len(turn.question)
+                if room >= 80 and not messages:
+                    messages[:0] = [{"role": "user", "content": turn.question},
+                                    {"role": "assistant", "content": turn.answer[:room] + " ..."}]
+                break
+            messages[:0] = [{"role": "user", "content": turn.question},
+                            {"role": "assistant", "content": turn.answer}]
+            budget -= cost
+        return messages
+
+
+class SessionStore:
+    """Bounded, idle-evicting map of session id -> ConversationSession"""
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS, idle_seconds: float = SESSION_IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ConversationSession:
+        """The live session for ``session_id``, or a new one (with a fresh id if none or invalid was given)"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                if not session_id or not SESSION_ID_PATTERN.match(session_id):
+                    session_id = secrets.token_urlsafe(16)
+                session = self._sessions[session_id] = ConversationSession(session_id)
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+            return session
+
+    def end(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict(self, now: float):
+        # Least recently used first, so stop at the first live session
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used < self.idle_seconds:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+session_store = SessionStore()
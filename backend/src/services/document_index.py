@@ -0,0 +1,316 @@
+"""
+Document Index
+Page-aware chunk index with in-place incremental updates.
+
+Each page is chunked on its own so a revised page can be re-chunked and
+re-embedded without touching the rest of the document. Pages can also be
+streamed in straight from an extractor and are chunked as they arrive. The index keeps a
+lexical inverted index (analyzed term -> chunk -> count) and, when embeddings are
+available, a langchain vector store; both are patched with add/remove
+operations rather than rebuilt.
+"""
+
+import hashlib
+import re
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document as LangchainDocument
+from src.services.text_analysis import LexicalIndex, TextAnalyzer
+
+PAGE_MARKER = re.compile(r"^--- Page (\d+) ---$", re.MULTILINE)
+
+
+# Chunks embedded per vector store call when a document is streamed in
+EMBED_BATCH_SIZE = 256
+
+# Characters per page when a document has neither page markers nor form feeds
+SEGMENT_SIZE = 1 << 14
+
+
+def iter_pages(blocks: Iterable[str], segment_size: int = SEGMENT_SIZE) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) pairs from consecutive pieces of a document.
+
+    Understands the ``--- Page N ---`` markers used in the processed POH data
+    and form feeds; text before the first marker is kept as page 0. A
+    document with neither is cut into numbered segments of about
+    ``segment_size`` characters at line boundaries, so no more than one
+    segment is held at a time. ``blocks`` must each end at a line boundary.
+
+    The first kind of separator seen decides how the rest of the document is
+    paged, and the first ``segment_size`` characters count as one: markers
+    are only looked for until the first segment has been cut, after which a
+    marker line is ordinary text. Segments already yielded cannot be
+    renumbered, so this keeps every page without clashing page numbers.
+    """
+    number, parts, size, mode = 1, [], 0, None
+    for block in blocks:
+        if mode in (None, "marker"):
+            position = 0
+            for marker in PAGE_MARKER.finditer(block):
+                parts.append(block[position:marker.start()])
+                text = "".join(parts).strip("\n")
+                if mode == "marker":
+                    yield number, text
+                elif text.strip():
+                    yield 0, text
+                mode = "marker"
+                number, parts, position = int(marker.group(1)), [], marker.end()
+            if mode == "marker":
+                parts.append(block[position:])
+                continue
+
+        if mode is None and "\f" in block:
+            mode = "feed"
+        if mode == "feed":
+            *complete, block = block.split("\f")
+            for piece in complete:
+                parts.append(piece)
+                yield number, "".join(parts)
+                number, parts = number + 1, []
+            parts.append(block)
+            continue
+
+        parts.append(block)
+        size += len(block)
+        if size < segment_size:
+            continue
+        mode, text = "segment", "".join(parts)
+        while len(text) >= segment_size:
+            cut = text.rfind("\n", 0, segment_size) + 1 or segment_size
+            yield number, text[:cut]
+            number, text = number + 1, text[cut:]
+        parts, size = [text], len(text)
+
+    text = "".join(parts)
+    if mode != "segment" or text:
+        yield number, text.strip("\n") if mode == "marker" else text
+
+
+def split_pages(text: str) -> Dict[int, str]:
+    """Split extracted text into numbered pages (see ``iter_pages``)"""
+    return dict(iter_pages((text,)))
+
+
+def _page_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+class DocumentIndex:
+    """Chunked document with a lexical and an optional vector index"""
+
+    def __init__(self, title: str, embeddings=None,
+                 vector_store_factory: Optional[Callable] = None,
+                 chunk_size: int = 1000, chunk_overlap: int = 200,
+                 analyzer: Optional[TextAnalyzer] = None):
+        self.title = title
+        self.embeddings = embeddings
+        self.vector_store_factory = vector_store_factory
+        self.vector_store = None
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+        )
+
+        self.pages: Dict[int, str] = {}
+        self.page_hashes: Dict[int, str] = {}
+        self.page_chunks: Dict[int, List[str]] = {}
+        self.chunks: Dict[str, Dict] = {}
+        self.lexical_index = LexicalIndex(analyzer)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def page_texts(self) -> List[str]:
+        """Page texts in page order"""
+        with self._lock:
+            return [self.pages[number] for number in sorted(self.pages)]
+
+    @property
+    def text(self) -> str:
+        """The current document text, pages in order"""
+        return "\n".join(self.page_texts())
+
+    def build(self, pages: Union[Mapping[int, str], Iterable[Tuple[int, str]]],
+              vector_store=None) -> int:
+        """Index a complete document, returning the chunk count.
+
+        ``pages`` is a mapping of page numbers to text or an iterable of
+        (number, text) pairs, e.g. from ``iter_pages``; an iterable is chunked
+        and embedded in batches as it is consumed. Pass ``vector_store`` to
+        adopt an already embedded copy of the same pages (e.g. one published
+        by another worker) instead of re-embedding.
+        """
+        if vector_store is None:
+            self._build(pages)
+        else:
+            embeddings, self.embeddings = self.embeddings, None
+            try:
+                self._build(pages)
+            finally:
+                self.embeddings = embeddings
+            self.vector_store = vector_store
+        return len(self.chunks)
+
+    def _build(self, pages):
+        if isinstance(pages, Mapping) or self.pages:
+            self.update_pages(dict(pages), replace_all=True)
+            return
+
+        with self._lock:
+            stale_ids, documents = [], []
+            for number, text in pages:
+                if number in self.pages:
+                    # A repeated page number replaces the earlier page
+                    dropped = set(self._drop_page(number))
+                    pending = {doc.metadata["id"] for doc in documents}
+                    stale_ids.extend(dropped - pending)
+                    documents = [doc for doc in documents if doc.metadata["id"] not in dropped]
+                documents.extend(self._add_page(number, text))
+                if len(documents) >= EMBED_BATCH_SIZE:
+                    self._apply_vector_changes(stale_ids, documents)
+                    stale_ids, documents = [], []
+            self._apply_vector_changes(stale_ids, documents)
+
+    def update_pages(self, pages: Dict[int, str], removed_pages: Iterable[int] = (),
+                     replace_all: bool = False) -> Dict:
+        """Apply a new version of some or all pages.
+
+        ``pages`` maps page numbers to their new text. Pages whose content hash
+        is unchanged are skipped. With ``replace_all`` the given pages are the
+        complete new version and any page not in it is removed; otherwise only
+        ``removed_pages`` are dropped (revision-page replacement).
+        """
+        with self._lock:
+            removed = set(removed_pages)
+            if replace_all:
+                removed |= set(self.pages) - set(pages)
+
+            added, changed, unchanged = [], [], []
+            for number, text in pages.items():
+                digest = _page_hash(text)
+                if self.page_hashes.get(number) == digest:
+                    unchanged.append(number)
+                elif number in self.pages:
+                    changed.append(number)
+                else:
+                    added.append(number)
+
+            stale_ids = []
+            for number in list(removed) + changed:
+                stale_ids.extend(self._drop_page(number))
+
+            new_documents = []
+            for number in added + changed:
+                new_documents.extend(self._add_page(number, pages[number]))
+
+            self._apply_vector_changes(stale_ids, new_documents)
+
+            return {
+                "added_pages": sorted(added),
+                "changed_pages": sorted(changed),
+                "removed_pages": sorted(number for number in removed if number not in pages),
+                "unchanged_pages": len(unchanged),
+                "chunks_added": len(new_documents),
+                "chunks_removed": len(stale_ids),
+                "chunk_count": len(self.chunks),
+            }
+
+    def _drop_page(self, number: int) -> List[str]:
+        chunk_ids = self.page_chunks.pop(number, [])
+        for chunk_id in chunk_ids:
+            chunk = self.chunks.pop(chunk_id)
+            self.lexical_index.remove(chunk_id, chunk["text"])
+        self.pages.pop(number, None)
+        self.page_hashes.pop(number, None)
+        return chunk_ids
+
+    def _add_page(self, number: int, text: str) -> List[LangchainDocument]:
+        self.pages[number] = text
+        digest = _page_hash(text)
+        self.page_hashes[number] = digest
+
+        documents = []
+        chunk_ids = []
+        for i, chunk_text in enumerate(self.text_splitter.split_text(text)):
+            chunk_id = f"p{number}-c{i}-{digest[:8]}"
+            metadata = {"source": self.title, "page": number, "chunk_index": i}
+            self.chunks[chunk_id] = {"id": chunk_id, "text": chunk_text, "metadata": metadata}
+            chunk_ids.append(chunk_id)
+            self.lexical_index.add(chunk_id, chunk_text)
+            documents.append(LangchainDocument(page_content=chunk_text, metadata=dict(metadata, id=chunk_id)))
+
+        self.page_chunks[number] = chunk_ids
+        return documents
+
+    def _apply_vector_changes(self, stale_ids: List[str], documents: List[LangchainDocument]):
+        if not self.embeddings:
+            return
+
+        if self.vector_store is not None and stale_ids:
+            self.vector_store.delete(stale_ids)
+
+        if documents:
+            ids = [doc.metadata["id"] for doc in documents]
+            if self.vector_store is None:
+                self.vector_store = self.vector_store_factory(documents, self.embeddings, ids=ids)
+            else:
+                self.vector_store.add_documents(documents, ids=ids)
+
+    def search(self, query: str, max_chunks: int = 5) -> List[Dict]:
+        """Rank chunks by summed query-term counts over the inverted index"""
+        with self._lock:
+            ranked = self.lexical_index.search(query, max_chunks)
+            return [self.chunks[chunk_id] for chunk_id, _ in ranked]
+
+    def ordered_chunks(self) -> List[Dict]:
+        """Chunk records in page order"""
+        with self._lock:
+            return [self.chunks[chunk_id] for number in sorted(self.page_chunks)
+                    for chunk_id in self.page_chunks[number]]
+
+
+class SharedDocumentIndex:
+    """Read-only index over a document published by another worker.
+
+    Pages and chunk text stay in the shared segment and are decoded when
+    used; the only per-worker structure is the lexical postings, keyed by
+    chunk position. An update in this worker first copies the document into
+    a DocumentIndex with ``to_document_index``.
+    """
+
+    def __init__(self, title: str, pages: Mapping[int, str], chunks: Sequence,
+                 embeddings=None, vector_store=None, analyzer: Optional[TextAnalyzer] = None):
+        self.title = title
+        self.pages = pages
+        self.chunks = chunks
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.lexical_index = LexicalIndex(analyzer)
+        for position, chunk in enumerate(chunks):
+            self.lexical_index.add(position, chunk["text"])
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def page_texts(self) -> Iterator[str]:
+        return (self.pages[number] for number in sorted(self.pages))
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.page_texts())
+
+    def search(self, query: str, max_chunks: int = 5) -> List[Dict]:
+        return [self.chunks[position] for position, _ in self.lexical_index.search(query, max_chunks)]
+
+    def ordered_chunks(self) -> Sequence:
+        return self.chunks
+
+    def to_document_index(self, vector_store_factory: Optional[Callable] = None) -> DocumentIndex:
+        """A private, updatable copy (adopting the shared vector store, chunk ids are the same)"""
+        index = DocumentIndex(self.title, embeddings=self.embeddings, vector_store_factory=vector_store_factory)
+        index.build(dict(self.pages.items()), vector_store=self.vector_store)
+        return index
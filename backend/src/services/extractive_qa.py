@@ -0,0 +1,298 @@
+"""
+Extractive QA
+Answers questions from retrieved chunks without an LLM call.
+
+Each retrieved chunk is split into sentences once (cached by chunk id) and
+every sentence keeps its analyzed terms and the numeric values with units it
+mentions. A question is answered by scoring those sentences on how many of
+its terms they contain, how close together and how densely; spec questions
+("What is the fuel capacity?") additionally look for a value whose unit fits
+the question (gallons for capacity, mph or knots for speed, ...).
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.services.ocr_text import normalize_ocr_text
+from src.services.text_analysis import TextAnalyzer, default_analyzer, stem
+
+# "hybrid": answer spec questions extractively when a value is found and use
+# the LLM for the rest; "extractive": never call the LLM; "llm": always call it
+ANSWER_MODE = os.environ.get("ANSWER_MODE", "hybrid").lower()
+
+# In hybrid mode a value skips the LLM only when its sentence covers every
+# term of the question and the answer is at least this confident
+EXTRACTIVE_MIN_CONFIDENCE = float(os.environ.get("EXTRACTIVE_MIN_CONFIDENCE", "0.9"))
+
+# A sentence ends at . ! ? before the next capitalized word, at a blank line,
+# and at a line break unless the next line carries on in lowercase
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])[ \t]+(?=[A-Z0-9(\"'])|[ \t]*\n(?![ \t]*[a-z])\s*")
+PAGE_MARKER_LINE = re.compile(r"^--- Page \d+ ---$")
+WHITESPACE = re.compile(r"\s+")
+
+NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+
+# Unit spellings and the kind of quantity they measure; longer forms first
+UNITS = [
+    (r"ft\.? per min(?:ute)?|feet per minute|fpm", "rate"),
+    (r"miles per hour|mph", "speed"),
+    (r"knots|kts|kias|kcas", "speed"),
+    (r"lbs?\.?|pounds?", "weight"),
+    (r"(?:u\.\s?s\.\s?)?gal(?:lons?|s)?\.?|quarts?|qts?\.?|pints?", "volume"),
+    (r"b?hp|horsepower", "power"),
+    (r"rpm", "rotation"),
+    (r"in\.?\s?hg|inches of mercury|psi", "pressure"),
+    (r"ft\.?|feet|nautical miles|nm|statute miles|miles|mi\.?", "distance"),
+    (r"inch(?:es)?|in\.", "length"),
+    (r"degrees\s?[fc]\b|°\s?[fc]\b", "temperature"),
+    (r"volts?|amps?|amperes?", "electrical"),
+]
+UNIT_KINDS = [(re.compile(rf"^(?:{pattern})$", re.IGNORECASE), kind) for pattern, kind in UNITS]
+UNIT_PATTERN = "|".join(pattern for pattern, _ in UNITS)
+
+# "84 gallons", "3400 lbs" and the spec-table form "Fuel Capacity (U.S. gal) 84"
+VALUE_THEN_UNIT = re.compile(rf"(?<![\w.])({NUMBER})\s?({UNIT_PATTERN})(?![a-z])", re.IGNORECASE)
+UNIT_THEN_VALUE = re.compile(rf"\((?:[^()]*?\b)?({UNIT_PATTERN})\)[^\d()]{{0,20}}?({NUMBER})(?![\d.])",
+                             re.IGNORECASE)
+
+# Question words that say which kind of value is wanted
+QUESTION_KINDS = {
+    "weight": "weight", "weigh": "weight", "heavy": "weight", "gross": "weight", "load": "weight",
+    "mtow": "weight", "gw": "weight", "pound": "weight", "lb": "weight",
+    "speed": "speed", "fast": "speed", "mph": "speed", "knot": "speed", "kt": "speed",
+    "vne": "speed", "vno": "speed", "va": "speed", "vx": "speed", "vy": "speed", "vso": "speed",
+    "vfe": "speed", "stall": "speed", "cruise": "speed",
+    "capacity": "volume", "gallon": "volume", "quart": "volume", "hold": "volume", "tank": "volume",
+    "horsepower": "power", "hp": "power",
+    "rpm": "rotation",
+    "pressure": "pressure", "psi": "pressure",
+    "distance": "distance", "ceiling": "distance", "altitude": "distance", "runway": "distance",
+    "roll": "distance", "range": "distance",
+    "temperature": "temperature",
+    "voltage": "electrical", "volt": "electrical", "amp": "electrical", "amperage": "electrical",
+    "climb": "rate",
+}
+QUESTION_KINDS = {stem(word): kind for word, kind in QUESTION_KINDS.items()}
+
+
+def unit_kind(unit: str) -> Optional[str]:
+    unit = WHITESPACE.sub(" ", unit.strip())
+    for pattern, kind in UNIT_KINDS:
+        if pattern.match(unit):
+            return kind
+    return None
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of ``text`` with line wrapping folded into spaces"""
+    sentences = []
+    for raw in SENTENCE_BOUNDARY.split(text):
+        sentence = WHITESPACE.sub(" ", raw).strip()
+        if sentence and not PAGE_MARKER_LINE.match(sentence) and any(ch.isalpha() for ch in sentence):
+            sentences.append(sentence)
+    return sentences
+
+
+def spec_values(text: str) -> List[Tuple[str, str, str, int]]:
+    """(number, unit, kind, offset) for each value with a unit in ``text``"""
+    text = normalize_ocr_text(text)
+    values = []
+    for match in VALUE_THEN_UNIT.finditer(text):
+        kind = unit_kind(match.group(2))
+        if kind:
+            values.append((match.group(1), match.group(2), kind, match.start()))
+    for match in UNIT_THEN_VALUE.finditer(text):
+        kind = unit_kind(match.group(1))
+        if kind:
+            values.append((match.group(2), match.group(1), kind, match.start(2)))
+    values.sort(key=lambda value: value[3])
+    return values
+
+
+class Sentence:
+    """A sentence with its analyzed terms (in order) and spec values"""
+
+    __slots__ = ("text", "terms", "values")
+
+    def __init__(self, text: str, terms: Tuple[str, ...], values: List[Tuple[str, str, str, int]]):
+        self.text = text
+        self.terms = terms
+        self.values = values
+
+
+class ExtractiveAnswerer:
+    """Sentence scoring and spec-value extraction over retrieved passages"""
+
+    def __init__(self, analyzer: Optional[TextAnalyzer] = None, cache_size: int = 4096):
+        self.analyzer = analyzer or default_analyzer
+        self.cache_size = cache_size
+        self._sentences: "OrderedDict[str, List[Sentence]]" = OrderedDict()
+        # Request threads share the answerer; the LRU bookkeeping is not atomic
+        self._lock = threading.Lock()
+
+    def sentences(self, text: str, key: Optional[str] = None) -> List[Sentence]:
+        """The sentence index of one passage, cached under ``key`` if given"""
+        if key is not None:
+            with self._lock:
+                cached = self._sentences.get(key)
+                if cached is not None:
+                    self._sentences.move_to_end(key)
+                    return cached
+
+        sentences = [
+            Sentence(sentence, tuple(self.analyzer.analyze(sentence)), spec_values(sentence))
+            for sentence in split_sentences(text)
+        ]
+        if key is not None:
+            with self._lock:
+                self._sentences[key] = sentences
+                while len(self._sentences) > self.cache_size:
+                    self._sentences.popitem(last=False)
+        return sentences
+
+    def question_kind(self, question: str) -> Optional[str]:
+        """The kind of value a spec question asks for, if any"""
+        for term in self.analyzer.analyze(question):
+            if term in QUESTION_KINDS:
+                return QUESTION_KINDS[term]
+        return None
+
+    def _term_groups(self, question: str) -> List[frozenset]:
+        # Each typed term matches itself or its synonym; an abbreviation of
+        # several words ("vne") needs every word of its expansion, so a lone
+        # "speed" does not cover it
+        groups = []
+        for term in dict.fromkeys(self.analyzer.analyze(question)):
+            expansion = self.analyzer.expansions.get(term, ())
+            if len(expansion) > 1:
+                groups.extend(frozenset((term, word)) for word in expansion)
+            else:
+                groups.append(frozenset((term,) + expansion))
+        return groups
+
+    @staticmethod
+    def _score(sentence: Sentence, groups: Sequence[frozenset]) -> Tuple[float, float]:
+        """(score, coverage) from term coverage, proximity and density"""
+        positions = []
+        for group in groups:
+            hits = [i for i, term in enumerate(sentence.terms) if term in group]
+            if hits:
+                positions.append(hits)
+        if not positions:
+            return 0.0, 0.0
+
+        coverage = len(positions) / len(groups)
+        # Smallest window holding one hit of every matched group (greedy)
+        anchors = [hits[0] for hits in positions]
+        window = max(anchors) - min(anchors) + 1
+        proximity = len(positions) / window
+        density = sum(len(hits) for hits in positions) / max(len(sentence.terms), 1)
+        # Headings repeat the question's words but answer nothing
+        substance = 0.5 + 0.5 * min(1.0, len(sentence.terms) / 8)
+        return (2.0 * coverage + proximity + 0.5 * density) * substance, coverage
+
+    def rank(self, question: str, passages: Iterable[Tuple[Optional[str], str]],
+             limit: int = 3) -> List[Tuple[Sentence, float, float]]:
+        """Best (sentence, score, coverage) triples across ``passages``.
+
+        ``passages`` are (cache key or None, text) pairs, e.g. chunk ids and
+        texts of the retrieved chunks.
+        """
+        groups = self._term_groups(question)
+        if not groups:
+            return []
+        kind = self.question_kind(question)
+
+        scored = []
+        seen = set()
+        for key, text in passages:
+            for sentence in self.sentences(text, key):
+                if sentence.text in seen:
+                    continue
+                seen.add(sentence.text)
+                score, coverage = self._score(sentence, groups)
+                if score <= 0:
+                    continue
+                if kind and any(value[2] == kind for value in sentence.values):
+                    score += 1.0
+                scored.append((sentence, score, coverage))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
+
+    def _nearest_value(self, sentence: Sentence, values: List[Tuple[str, str, str, int]],
+                       terms: Tuple[str, ...]) -> Tuple[str, str, str, int]:
+        """The value closest to the question's terms ("17" in "... 25 gallons, each tip tank 17")"""
+        if len(values) == 1:
+            return values[0]
+        nearest: Dict[str, List[int]] = {}
+        for offset, term in self.analyzer.find_terms(normalize_ocr_text(sentence.text), terms):
+            nearest.setdefault(term, []).append(offset)
+        if not nearest:
+            return values[0]
+        return min(values, key=lambda value: sum(
+            min(abs(value[3] - offset) for offset in offsets) for offsets in nearest.values()))
+
+    def answer(self, question: str, passages: Iterable[Tuple[Optional[str], str]],
+               limit: int = 3) -> Optional[Dict]:
+        """Extractive answer, or None when no sentence matches the question.
+
+        The result has the supporting ``sentences`` and, for spec questions
+        whose best sentences state a value of the asked-for kind, ``value``
+        (e.g. "84 gallons"). ``confidence`` follows term coverage.
+        """
+        ranked = self.rank(question, passages, limit)
+        if not ranked:
+            return None
+
+        kind = self.question_kind(question)
+        value = None
+        best_coverage = ranked[0][2]
+        if kind:
+            terms = tuple(sorted(set().union(*self._term_groups(question))))
+            for sentence, score, coverage in ranked:
+                # Only sentences as complete as the best one, and covering more
+                # than half of the question, may supply the value
+                if coverage < best_coverage or coverage <= 0.5:
+                    continue
+                values = [found for found in sentence.values if found[2] == kind]
+                if values:
+                    number, unit, _, _ = self._nearest_value(sentence, values, terms)
+                    unit = unit.rstrip(".")
+                    value = {"text": f"{number} {unit}", "number": number, "unit": unit,
+                             "kind": kind, "sentence": sentence.text, "coverage": coverage}
+                    break
+
+        return {
+            "sentences": [sentence.text for sentence, _, _ in ranked],
+            "value": value,
+            "kind": kind,
+            "coverage": best_coverage,
+            "confidence": round(0.4 + 0.4 * (value["coverage"] if value else best_coverage) + (0.1 if value else 0), 2),
+        }
+
+
+extractive_answerer = ExtractiveAnswerer()
+
+
+def should_answer_extractively(extractive: Optional[Dict], llm_available: bool) -> bool:
+    """Whether an extractive result should be returned instead of asking the LLM"""
+    if extractive is None:
+        return False
+    if not llm_available or ANSWER_MODE == "extractive":
+        return True
+    value = extractive["value"]
+    # A partly matching sentence easily holds the wrong value of the right
+    # kind ("84 gallons" total for the tip tanks); leave those to the LLM
+    return (ANSWER_MODE == "hybrid" and value is not None and value["coverage"] >= 1.0
+            and extractive["confidence"] >= EXTRACTIVE_MIN_CONFIDENCE)
+
+
+def format_answer(extractive: Dict, source: str) -> str:
+    """Answer text: the value with its supporting sentence, or the best sentences"""
+    value = extractive["value"]
+    if value:
+        return f"According to {source}: {value['text']}.\n\n\"{value['sentence']}\""
+    return f"Based on {source}, here are the most relevant passages:\n\n" + "\n\n".join(extractive["sentences"])
@@ -0,0 +1,101 @@
+"""
+Fuzzy Term Index
+SymSpell-style deletion index over an index vocabulary.
+
+Every vocabulary term is stored under all of its variants with up to
+``max_distance`` characters deleted (from a fixed-length prefix, which keeps
+the table small). A misspelled query term finds its candidates by looking up
+its own deletion variants, so a lookup costs a few dozen dict probes instead
+of a scan over the vocabulary or the corpus.
+"""
+
+from itertools import combinations
+from typing import Dict, List, Set, Tuple
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    variants = {word}
+    for distance in range(1, min(max_distance, len(word) - 1) + 1):
+        for positions in combinations(range(len(word)), distance):
+            variants.add("".join(ch for i, ch in enumerate(word) if i not in positions))
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class DeletionIndex:
+    """Maps misspelled terms to the closest terms of a changing vocabulary"""
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 7, min_length: int = 4):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.min_length = min_length
+        self.deletes: Dict[str, Set[str]] = {}
+        self.terms: Set[str] = set()
+
+    def _indexable(self, term: str) -> bool:
+        return len(term) >= self.min_length and term.isalpha()
+
+    def allowed_distance(self, term: str) -> int:
+        """Short words tolerate fewer edits before they become other words"""
+        return 1 if len(term) < 6 else self.max_distance
+
+    def add(self, term: str):
+        if term in self.terms or not self._indexable(term):
+            return
+        self.terms.add(term)
+        for variant in _deletes(term[:self.prefix_length], self.max_distance):
+            self.deletes.setdefault(variant, set()).add(term)
+
+    def remove(self, term: str):
+        if term not in self.terms:
+            return
+        self.terms.discard(term)
+        for variant in _deletes(term[:self.prefix_length], self.max_distance):
+            bucket = self.deletes.get(variant)
+            if bucket is not None:
+                bucket.discard(term)
+                if not bucket:
+                    del self.deletes[variant]
+
+    def lookup(self, term: str, limit: int = 3) -> List[Tuple[str, int]]:
+        """Closest vocabulary terms as (term, distance), nearest first"""
+        if not self._indexable(term):
+            return []
+
+        max_distance = self.allowed_distance(term)
+        candidates = set()
+        for variant in _deletes(term[:self.prefix_length], max_distance):
+            candidates.update(self.deletes.get(variant, ()))
+
+        matches = []
+        for candidate in candidates:
+            if candidate == term:
+                continue
+            distance = edit_distance(term, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((candidate, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches[:limit]
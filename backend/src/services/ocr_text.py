@@ -0,0 +1,42 @@
+"""
+OCR Text Normalization
+Index-time cleanup for text that came out of OCR (the bundled POH is a scan).
+
+Folds digit/letter confusions ("3OO" -> "300", "t0I" -> "toI"), joins words
+hyphenated across line breaks and collapses whitespace. Only used to derive
+index terms; the text shown to users is left as extracted.
+"""
+
+import re
+
+# Words split across a line break: "compart-\nment"
+HYPHEN_BREAK = re.compile(r"(?<=[A-Za-z])-[ \t]*\n[ \t]*(?=[a-z])")
+SPACES = re.compile(r"[ \t\u00a0\u2000-\u200b]+")
+BLANK_LINES = re.compile(r"\n(?:[ \t]*\n){2,}")
+
+# Numbers with O/o/I/l in place of 0 and 1: "3OO", "l0", "I4"
+NUMERIC_TOKEN = re.compile(r"\b(?=[0-9OoIl]*[0-9])(?=[0-9]*[OoIl])[0-9OoIl]{2,}\b")
+NUMERIC_FOLD = str.maketrans("OoIl", "0011")
+
+# A zero or one inside a word: "t0I", "c0mpass", "a1ternator"
+ZERO_IN_WORD = re.compile(r"(?<=[A-Za-z])0(?=[A-Za-z])")
+ONE_IN_WORD = re.compile(r"(?<=[a-z])1(?=[a-z])")
+
+
+def _fold_number(match) -> str:
+    return match.group(0).translate(NUMERIC_FOLD)
+
+
+def _fold_zero(match) -> str:
+    previous = match.string[match.start() - 1]
+    return "O" if previous.isupper() else "o"
+
+
+def normalize_ocr_text(text: str) -> str:
+    """Return ``text`` with common OCR noise folded away"""
+    text = HYPHEN_BREAK.sub("", text)
+    text = NUMERIC_TOKEN.sub(_fold_number, text)
+    text = ZERO_IN_WORD.sub(_fold_zero, text)
+    text = ONE_IN_WORD.sub("l", text)
+    text = SPACES.sub(" ", text)
+    return BLANK_LINES.sub("\n\n", text)
@@ -5,17 +5,31 @@ Provides document-based question answering using the processed POH content
 
 import json
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import openai
 from openai import OpenAI
+from src.services import shared_corpus
+from src.services.chunk_store import ChunkStore
+from src.services.conversation import ConversationSession
+from src.services.extractive_qa import ANSWER_MODE, extractive_answerer, format_answer, should_answer_extractively
+from src.services.profiling import span
+from src.services.reranker import POH_RERANK, POH_RERANK_CANDIDATES, POH_RERANK_TOP_K, Reranker
+from src.services.spec_facts import FACTS_FILENAME, SpecFactTable, build_fact_table, format_fact
+from src.services.text_analysis import LexicalIndex
 
 class POHQAService:
-    def __init__(self):
-        self.data_dir = "/home/ubuntu/ai-backend/data"
+    def __init__(self, data_dir: Optional[str] = None):
+        self.data_dir = data_dir or os.environ.get("POH_DATA_DIR", "/home/ubuntu/ai-backend/data")
         self.content = None
         self.chunks = None
         self.client = None
+        self.shared_reader = None
+        self.lexical_index = None
+        self.reranker = None
+        self.indexed_chunks = None
+        self.fact_table = None
         self.load_content()
+        self.load_facts()
         self.setup_openai()
     
     def setup_openai(self):
@@ -29,6 +43,12 @@ class POHQAService:
     
     def load_content(self):
         """Load processed POH content"""
+        if shared_corpus.is_enabled():
+            self.shared_reader = shared_corpus.SharedCorpusReader("poh")
+            if self.refresh_shared_content():
+                return
+            print("Shared POH corpus not published, loading a private copy")
+        
         try:
             # Load full content
             content_path = os.path.join(self.data_dir, "poh_content.json")
@@ -37,18 +57,44 @@ class POHQAService:
                     self.content = json.load(f)
                 print(f"Loaded POH content: {self.content['title']}")
             
-            # Load chunks
+            # Load chunks into columns rather than one dict per chunk
             chunks_path = os.path.join(self.data_dir, "poh_chunks.json")
             if os.path.exists(chunks_path):
-                with open(chunks_path, 'r') as f:
-                    self.chunks = json.load(f)
+                sections = self.content["sections"] if self.content else None
+                self.chunks = ChunkStore.from_json_file(chunks_path, sections)
                 print(f"Loaded {len(self.chunks)} content chunks")
                 
         except Exception as e:
             print(f"Error loading POH content: {e}")
     
+    def load_facts(self):
+        """Load the precomputed spec fact table, extracting it here if it was not built"""
+        try:
+            facts_path = os.path.join(self.data_dir, FACTS_FILENAME)
+            if os.path.exists(facts_path):
+                self.fact_table = SpecFactTable.from_file(facts_path)
+            elif self.content:
+                self.fact_table = SpecFactTable(build_fact_table(self.content["pages"]))
+            if self.fact_table is not None:
+                print(f"Loaded {len(self.fact_table)} spec facts")
+        except Exception as e:
+            print(f"Warning: spec fact table unavailable: {e}")
+    
+    def refresh_shared_content(self) -> bool:
+        """Map the latest published POH corpus; True when one is attached"""
+        if self.shared_reader is None:
+            return False
+        try:
+            if self.shared_reader.poll():
+                self.content, self.chunks = shared_corpus.poh_from_segment(self.shared_reader.segment)
+                print(f"Mapped shared POH corpus v{self.shared_reader.version}: {len(self.chunks)} chunks")
+        except Exception as e:
+            print(f"Warning: shared POH corpus unavailable: {e}")
+        return self.shared_reader.segment is not None
+    
     def get_document_info(self) -> Dict:
         """Get document information"""
+        self.refresh_shared_content()
         if self.content:
             return {
                 "title": self.content["title"],
@@ -58,33 +104,84 @@ class POHQAService:
             }
         return {"title": "No document loaded", "subtitle": "", "pages": 0, "sections": 0}
     
+    def build_lexical_index(self):
+        """Index the current chunks with the shared analysis pipeline, and the re-ranker's arrays"""
+        index = LexicalIndex()
+        reranker = None
+        if POH_RERANK:
+            reranker = Reranker(self.content["sections"] if self.content else None, index.analyzer)
+        for position, chunk in enumerate(self.chunks):
+            text = chunk["text"]
+            # Both stages work on the same terms, analyzed once
+            terms = index.analyzer.analyze(text)
+            index.add_terms(position, terms)
+            if reranker is not None:
+                reranker.add(text, terms)
+        self.lexical_index = index
+        self.reranker = reranker.freeze() if reranker is not None else None
+        self.indexed_chunks = self.chunks
+    
+    def _search_positions(self, query: str, max_chunks: int = 5, candidates=None) -> List[int]:
+        # Rebuild when the chunk list was replaced (new shared version, tests)
+        if self.indexed_chunks is not self.chunks:
+            self.build_lexical_index()
+        if self.reranker is None:
+            return [position for position, score in self.lexical_index.search(query, max_chunks, candidates)]
+        
+        # Second stage: rescore the lexical index's best candidates, keep the top few
+        hits = self.lexical_index.search(query, max(POH_RERANK_CANDIDATES, max_chunks), candidates)
+        with span("rerank"):
+            ranked = self.reranker.rerank(query, hits, min(max_chunks, POH_RERANK_TOP_K))
+        return [position for position, score in ranked]
+    
     def search_relevant_chunks(self, query: str, max_chunks: int = 5) -> List[Dict]:
-        """Simple keyword-based search for relevant chunks"""
+        """Keyword search for relevant chunks over the analyzed inverted index, then re-ranked"""
         if not self.chunks:
             return []
+        return [self.chunks[position] for position in self._search_positions(query, max_chunks)]
+    
+    def search_session_chunks(self, question: str, session: ConversationSession,
+                              max_chunks: int = 5) -> Tuple[str, List[Dict]]:
+        """(retrieval query, chunks) for a question asked within ``session``.
         
-        query_lower = query.lower()
-        scored_chunks = []
+        Follow-ups whose words all occur in the session's cached chunks are
+        ranked within them by their own words (the candidates carry the
+        earlier topic); other questions search the whole index, follow-ups
+        together with the previous question, and add their hits (and the
+        chunks around them) to the session's candidates.
+        """
+        if not self.chunks:
+            return question, []
+        if self.indexed_chunks is not self.chunks:
+            self.build_lexical_index()
         
-        for chunk in self.chunks:
-            chunk_text = chunk["text"].lower()
-            score = 0
-            
-            # Simple keyword matching
-            query_words = query_lower.split()
-            for word in query_words:
-                if len(word) > 2:  # Skip very short words
-                    score += chunk_text.count(word)
-            
-            if score > 0:
-                scored_chunks.append((score, chunk))
+        query = question
+        if session.is_follow_up(question):
+            query = f"{question} {session.previous_question}"
+            candidates = session.candidate_positions(self.chunks)
+            if candidates and self.lexical_index.covers(question, candidates):
+                positions = self._search_positions(question, max_chunks, candidates)
+                session.remember_chunks(self.chunks, reversed(positions))
+                return query, [self.chunks[position] for position in positions]
         
-        # Sort by score and return top chunks
-        scored_chunks.sort(key=lambda x: x[0], reverse=True)
-        return [chunk for score, chunk in scored_chunks[:max_chunks]]
+        positions = self._search_positions(query, max_chunks)
+        last = len(self.chunks) - 1
+        neighbours = [near for position in positions for near in (position - 1, position + 1) if 0 <= near <= last]
+        session.remember_chunks(self.chunks, neighbours + list(reversed(positions)))
+        return query, [self.chunks[position] for position in positions]
     
-    def generate_answer(self, question: str) -> Dict:
-        """Generate answer based on POH content"""
+    def generate_answer(self, question: str, session: Optional[ConversationSession] = None) -> Dict:
+        """Generate answer based on POH content, within a conversation if ``session`` is given"""
+        if session is None:
+            return self._generate_answer(question)
+        # One question at a time per conversation
+        with session.lock:
+            result = self._generate_answer(question, session)
+            session.add_turn(question, result["answer"])
+        return result
+    
+    def _generate_answer(self, question: str, session: Optional[ConversationSession] = None) -> Dict:
+        self.refresh_shared_content()
         if not self.content:
             return {
                 "answer": "No document is currently loaded. Please upload a document first.",
@@ -92,8 +189,28 @@ class POHQAService:
                 "confidence": 0
             }
         
+        # Common spec questions are a dict lookup in the precomputed fact table
+        if self.fact_table is not None and ANSWER_MODE != "llm":
+            with span("facts"):
+                found = self.fact_table.lookup(question)
+                # "and with flaps down?" completes the previous question
+                if not found and session is not None and session.is_follow_up(question):
+                    found = self.fact_table.lookup(f"{question} {session.previous_question}")
+            if found:
+                key, fact = found
+                return {
+                    "answer": format_fact(fact, "the 1967 Piper Cherokee PA-32-300 POH"),
+                    "source": f"1967 Piper Cherokee PA-32-300 POH, page {fact['page']}",
+                    "confidence": 0.95
+                }
+        
         # Search for relevant content
-        relevant_chunks = self.search_relevant_chunks(question)
+        query = question
+        with span("retrieval"):
+            if session is not None:
+                query, relevant_chunks = self.search_session_chunks(question, session)
+            else:
+                relevant_chunks = self.search_relevant_chunks(question)
         
         if not relevant_chunks:
             return {
@@ -102,18 +219,30 @@ class POHQAService:
                 "confidence": 0
             }
         
+        # Spec questions answered straight from the text skip the LLM round trip
+        with span("extractive"):
+            extractive = extractive_answerer.answer(
+                query, [(chunk["id"], chunk["text"]) for chunk in relevant_chunks])
+        if should_answer_extractively(extractive, self.client is not None):
+            return {
+                "answer": format_answer(extractive, "the 1967 Piper Cherokee PA-32-300 POH"),
+                "source": "1967 Piper Cherokee PA-32-300 POH",
+                "confidence": extractive["confidence"]
+            }
+        
         # Combine relevant chunks
         context = "\n\n".join([chunk["text"] for chunk in relevant_chunks])
         
         # Generate answer using OpenAI if available
         if self.client:
             try:
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"""You are an AI assistant specialized in the 1967 Piper Cherokee PA-32-300 POH (Pilot's Operating Handbook). 
+                with span("llm"):
+                    response = self.client.chat.completions.create(
+                        model="gpt-3.5-turbo",
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": f"""You are an AI assistant specialized in the 1967 Piper Cherokee PA-32-300 POH (Pilot's Operating Handbook). 
 
 IMPORTANT RULES:
 1. Only answer questions based on the provided POH content
@@ -124,15 +253,17 @@ IMPORTANT RULES:
 
 POH Content:
 {context}"""
-                        },
-                        {
-                            "role": "user",
-                            "content": question
-                        }
-                    ],
-                    max_tokens=500,
-                    temperature=0.3
-                )
+                            },
+                            # Prior turns of the conversation, within the history token budget
+                            *(session.history_messages() if session is not None else []),
+                            {
+                                "role": "user",
+                                "content": question
+                            }
+                        ],
+                        max_tokens=500,
+                        temperature=0.3
+                    )
                 
                 answer = response.choices[0].message.content.strip()
                 return {
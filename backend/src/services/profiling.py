@@ -0,0 +1,305 @@
+"""
+Request Profiling
+Opt-in per-request profiling with stage spans.
+
+A request is profiled when it carries an ``X-Profile`` header (and
+PROFILING_ENABLED is set) or when it is picked by the PROFILE_SAMPLE_RATE
+sampler. Profiled requests record a cProfile or statistical stack profile
+plus named stage spans (``with span("retrieval"): ...``); the last
+PROFILE_MAX_STORED profiles are kept in memory for the admin endpoints.
+"""
+
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from flask import g, has_request_context, request
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer.
+
+    Much cheaper than cProfile for long requests; produces collapsed stacks
+    (``frame;frame;frame count``) that flame graph tools read directly.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class _StoredStats:
+    """Lets ``pstats.Stats`` load marshalled stats held in memory"""
+
+    def __init__(self, data: bytes):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+
+class ProfileRecord:
+    """One profiled request"""
+
+    def __init__(self, profile_id: int, method: str, path: str, mode: str, reason: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.mode = mode
+        self.reason = reason
+        self.started_at = time.time()
+        self.status: Optional[int] = None
+        self.duration_ms: Optional[float] = None
+        self.spans: List[Dict] = []
+        self.data: Optional[bytes] = None
+        self._start = time.perf_counter()
+
+    def add_span(self, name: str, start: float, end: float):
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self._start) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+        })
+
+    def finish(self, status: int):
+        self.status = status
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "mode": self.mode,
+            "reason": self.reason,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": self.spans,
+            "has_profile": self.data is not None,
+        }
+
+    def report(self, limit: int = 30) -> str:
+        """Human readable profile text"""
+        if self.data is None:
+            return ""
+        if self.mode == "sampling":
+            lines = self.data.decode("utf-8").splitlines()
+            return "\n".join(lines[:limit])
+        stream = io.StringIO()
+        pstats.Stats(_StoredStats(self.data), stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def download(self):
+        """Return (payload, filename, mimetype) for the raw profile"""
+        if self.mode == "sampling":
+            return self.data, f"profile-{self.id}.folded", "text/plain"
+        # Same format as cProfile's dump_stats; open with pstats.Stats(path)
+        return self.data, f"profile-{self.id}.prof", "application/octet-stream"
+
+
+class ProfileStore:
+    """Bounded, thread-safe store of the most recent profiles"""
+
+    def __init__(self, max_profiles: int = 20):
+        self._records = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_record(self, method: str, path: str, mode: str, reason: str) -> ProfileRecord:
+        return ProfileRecord(next(self._ids), method, path, mode, reason)
+
+    def add(self, record: ProfileRecord):
+        with self._lock:
+            self._records.append(record)
+
+    def get(self, profile_id: int) -> Optional[ProfileRecord]:
+        with self._lock:
+            for record in self._records:
+                if record.id == profile_id:
+                    return record
+        return None
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [record.summary() for record in reversed(self._records)]
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+profile_store = ProfileStore(int(os.environ.get("PROFILE_MAX_STORED", 20)))
+
+
+def current_record() -> Optional[ProfileRecord]:
+    if not has_request_context():
+        return None
+    return g.get("profile_record")
+
+
+@contextmanager
+def span(name: str):
+    """Time a named stage of the current request when it is being profiled"""
+    record = current_record()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record.add_span(name, start, time.perf_counter())
+
+
+def chain_callbacks() -> List:
+    """Langchain callbacks that split a chain call into retrieval and LLM spans"""
+    record = current_record()
+    if record is None:
+        return []
+
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class SpanCallbackHandler(BaseCallbackHandler):
+        def __init__(self):
+            self.started = {}
+
+        def _start(self, run_id):
+            self.started[run_id] = time.perf_counter()
+
+        def _end(self, name, run_id):
+            start = self.started.pop(run_id, None)
+            if start is not None:
+                record.add_span(name, start, time.perf_counter())
+
+        def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+            self._start(run_id)
+
+        def on_retriever_end(self, documents, *, run_id, **kwargs):
+            self._end("retrieval", run_id)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._start(run_id)
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start(run_id)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            self._end("llm", run_id)
+
+    return [SpanCallbackHandler()]
+
+
+def _should_profile(app) -> Optional[str]:
+    if app.config.get("PROFILING_ENABLED") and request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes"):
+        return "header"
+    rate = app.config.get("PROFILE_SAMPLE_RATE", 0.0)
+    if rate > 0 and random.random() < rate:
+        return "sampled"
+    return None
+
+
+def init_profiling(app):
+    """Register the profiling request hooks on ``app``"""
+    app.config.setdefault("PROFILING_ENABLED", _env_flag("PROFILING_ENABLED"))
+    app.config.setdefault("PROFILE_SAMPLE_RATE", float(os.environ.get("PROFILE_SAMPLE_RATE", 0)))
+    app.config.setdefault("PROFILE_MODE", os.environ.get("PROFILE_MODE", "cprofile"))
+
+    @app.before_request
+    def start_profile():
+        reason = _should_profile(app)
+        if reason is None or request.path.startswith("/api/admin/"):
+            return
+
+        mode = request.headers.get("X-Profile-Mode", app.config["PROFILE_MODE"])
+        record = profile_store.new_record(request.method, request.path, mode, reason)
+        if mode == "sampling":
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+        else:
+            record.mode = "cprofile"
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another request in this process holds the profiler; keep spans only
+                record.mode = "spans"
+                profiler = None
+        g.profile_record = record
+        g.profiler = profiler
+
+    @app.after_request
+    def finish_profile(response):
+        record = g.pop("profile_record", None)
+        if record is None:
+            return response
+
+        profiler = g.pop("profiler", None)
+        if isinstance(profiler, StackSampler):
+            profiler.stop()
+            record.data = profiler.collapsed().encode("utf-8")
+        elif profiler is not None:
+            profiler.disable()
+            profiler.create_stats()
+            record.data = marshal.dumps(profiler.stats)
+
+        record.finish(response.status_code)
+        profile_store.add(record)
+        response.headers[PROFILE_ID_HEADER] = str(record.id)
+        return response
+
+    @app.teardown_request
+    def abandon_profile(exc):
+        # after_request is skipped on unhandled errors; make sure we stop
+        profiler = g.pop("profiler", None)
+        if isinstance(profiler, StackSampler):
+            profiler.stop()
+        elif profiler is not None:
+            profiler.disable()
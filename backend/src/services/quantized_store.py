@@ -0,0 +1,306 @@
+"""
+Quantized Vector Store
+Compact langchain vector store for uploaded documents.
+
+Embeddings are normalized and kept in memory as int8 codes with one scale
+per vector (a quarter of the float32 size). Chunk text and metadata live in
+an append-only side file that is mmap'd and read by offset, so no Document
+objects are held between queries. The full-precision vectors are appended to
+a second file on disk; when ``rerank`` is on, the best int8 candidates are
+re-scored against them, which recovers the float32 ranking.
+
+Stores deserialized in another worker map the same files read-only and copy
+them before their first write.
+"""
+
+import io
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+TEXT_FILE = "chunks.jsonl"
+VECTOR_FILE = "vectors.f32"
+
+# Rows scored per block, bounds the float32 temporary a query allocates
+SCORE_BLOCK_ROWS = 4096
+
+
+def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization: ``vectors ~= codes * scales``"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _remove_directory(path: str):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class QuantizedVectorStore(VectorStore):
+    """int8 vectors in memory, text and float32 vectors in mmap'd files"""
+
+    def __init__(self, embedding: Embeddings, directory: Optional[str] = None,
+                 rerank: bool = True, rerank_factor: int = 4):
+        self.embedding = embedding
+        self.rerank = rerank
+        self.rerank_factor = rerank_factor
+        self.directory = directory or tempfile.mkdtemp(
+            prefix="qvs-", dir=os.getenv("VECTOR_STORE_DIR") or None)
+        self._owned = directory is None
+        if self._owned:
+            self._finalizer = weakref.finalize(self, _remove_directory, self.directory)
+
+        self.ids: List[str] = []
+        self.positions = {}
+        self.codes = np.zeros((0, 0), dtype=np.int8)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        # Per row: byte offset and length in the text file, row in the vector file
+        self.text_offsets = np.zeros((0, 2), dtype=np.int64)
+        self.vector_rows = np.zeros(0, dtype=np.int64)
+        self._text_size = 0
+        self._vector_count = 0
+        self._text_map = None
+        self._vectors = None
+        self._lock = threading.RLock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def nbytes(self) -> int:
+        """Resident bytes of the in-memory index (codes, scales and offsets)"""
+        return (self.codes.nbytes + self.scales.nbytes + self.alive.nbytes
+                + self.text_offsets.nbytes + self.vector_rows.nbytes)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # Writing
+
+    def _ensure_writable(self):
+        """Copy files mapped from another process's store before appending"""
+        if self._owned:
+            return
+        directory = tempfile.mkdtemp(prefix="qvs-", dir=os.getenv("VECTOR_STORE_DIR") or None)
+        # Copy from the mappings: the owner may already have removed its files
+        with open(os.path.join(directory, TEXT_FILE), "wb") as text_file:
+            if self._text_size:
+                text_file.write(self._text_file()[:self._text_size])
+        with open(os.path.join(directory, VECTOR_FILE), "wb") as vector_file:
+            if self._vector_count:
+                vector_file.write(np.ascontiguousarray(self._vector_file()).tobytes())
+        self.directory = directory
+        self._owned = True
+        self._finalizer = weakref.finalize(self, _remove_directory, self.directory)
+        self._text_map = self._vectors = None
+
+    def add_embeddings(self, texts: List[str], vectors: List[List[float]],
+                       metadatas: Optional[List[dict]] = None,
+                       ids: Optional[List[str]] = None) -> List[str]:
+        """Add precomputed embeddings; existing ids are replaced"""
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        if not texts:
+            return []
+        if not len(vectors) == len(ids) == len(texts):
+            raise ValueError("texts, vectors and ids must have the same length")
+
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        codes, scales = quantize(vectors)
+
+        with self._lock:
+            self._ensure_writable()
+            self.delete([doc_id for doc_id in ids if doc_id in self.positions])
+
+            offsets = []
+            with open(self._path(TEXT_FILE), "ab") as text_file:
+                for doc_id, text, metadata in zip(ids, texts, metadatas):
+                    record = json.dumps({"id": doc_id, "text": text, "metadata": metadata}).encode("utf-8")
+                    offsets.append((self._text_size, len(record)))
+                    text_file.write(record + b"\n")
+                    self._text_size += len(record) + 1
+            with open(self._path(VECTOR_FILE), "ab") as vector_file:
+                vector_file.write(vectors.tobytes())
+            rows = np.arange(self._vector_count, self._vector_count + len(vectors))
+            self._vector_count += len(vectors)
+
+            start = len(self.ids)
+            if self.codes.shape[0] == 0:
+                self.codes = codes
+            else:
+                self.codes = np.vstack([self.codes, codes])
+            self.scales = np.concatenate([self.scales, scales])
+            self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+            self.text_offsets = np.vstack([self.text_offsets, np.asarray(offsets, dtype=np.int64)])
+            self.vector_rows = np.concatenate([self.vector_rows, rows])
+            for i, doc_id in enumerate(ids):
+                self.ids.append(doc_id)
+                self.positions[doc_id] = start + i
+            self._text_map = self._vectors = None
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embedding.embed_documents(texts), metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            for doc_id in ids:
+                position = self.positions.pop(doc_id, None)
+                if position is not None:
+                    self.alive[position] = False
+            if len(self.ids) > 2 * len(self.positions) + 64:
+                self._compact()
+        return True
+
+    def _compact(self):
+        """Drop deleted rows from memory (the files are append-only)"""
+        keep = np.flatnonzero(self.alive)
+        self.codes = self.codes[keep]
+        self.scales = self.scales[keep]
+        self.alive = self.alive[keep]
+        self.text_offsets = self.text_offsets[keep]
+        self.vector_rows = self.vector_rows[keep]
+        self.ids = [self.ids[i] for i in keep]
+        self.positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+
+    # Reading
+
+    def _text_file(self):
+        if self._text_map is None and self._text_size:
+            with open(self._path(TEXT_FILE), "rb") as file:
+                self._text_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._text_map
+
+    def _vector_file(self) -> np.ndarray:
+        if self._vectors is None:
+            self._vectors = np.memmap(self._path(VECTOR_FILE), dtype=np.float32, mode="r",
+                                      shape=(self._vector_count, self.codes.shape[1]))
+        return self._vectors
+
+    def _document(self, position: int) -> Document:
+        offset, length = self.text_offsets[position]
+        record = json.loads(self._text_file()[offset:offset + length])
+        return Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+
+    def get_by_ids(self, ids, /) -> List[Document]:
+        with self._lock:
+            return [self._document(self.positions[doc_id]) for doc_id in ids if doc_id in self.positions]
+
+    def _approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+            block = self.codes[start:start + SCORE_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        scores *= self.scales
+        scores[~self.alive] = -np.inf
+        return scores
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Cosine similarity search, highest score first"""
+        with self._lock:
+            if not self.positions:
+                return []
+            query = _normalize(np.asarray([embedding], dtype=np.float32))[0]
+            scores = self._approximate_scores(query)
+
+            count = min(k * self.rerank_factor if self.rerank else k, len(self.positions))
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.isfinite(scores[top])]
+            if self.rerank:
+                scores = scores.copy()
+                scores[top] = self._vector_file()[self.vector_rows[top]] @ query
+            top = top[np.argsort(-scores[top], kind="stable")][:k]
+            return [(self._document(position), float(scores[position])) for position in top]
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities in [-1, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None,
+                   **kwargs: Any) -> "QuantizedVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    # Sharing between workers
+
+    def serialize_to_bytes(self) -> bytes:
+        """The in-memory index plus the location of its files (same host only)"""
+        with self._lock:
+            self._compact()
+            buffer = io.BytesIO()
+            header = {
+                "directory": self.directory,
+                "ids": self.ids,
+                "text_size": self._text_size,
+                "vector_count": self._vector_count,
+                "rerank": self.rerank,
+                "rerank_factor": self.rerank_factor,
+            }
+            np.savez(buffer, header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+                     codes=self.codes, scales=self.scales, text_offsets=self.text_offsets,
+                     vector_rows=self.vector_rows)
+            return buffer.getvalue()
+
+    @classmethod
+    def deserialize_from_bytes(cls, serialized: bytes, embedding: Embeddings,
+                               **kwargs: Any) -> "QuantizedVectorStore":
+        arrays = np.load(io.BytesIO(serialized))
+        header = json.loads(arrays["header"].tobytes().decode("utf-8"))
+        store = cls(embedding, directory=header["directory"], rerank=header["rerank"],
+                    rerank_factor=header["rerank_factor"])
+        store.ids = header["ids"]
+        store.positions = {doc_id: i for i, doc_id in enumerate(store.ids)}
+        store.codes = arrays["codes"]
+        store.scales = arrays["scales"]
+        store.alive = np.ones(len(store.ids), dtype=bool)
+        store.text_offsets = arrays["text_offsets"]
+        store.vector_rows = arrays["vector_rows"]
+        store._text_size = header["text_size"]
+        store._vector_count = header["vector_count"]
+        # Map the files now so they stay readable if the owner replaces them
+        if store._vector_count:
+            store._text_file()
+            store._vector_file()
+        return store
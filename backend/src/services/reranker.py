@@ -0,0 +1,272 @@
+"""
+Re-ranking
+Second retrieval stage over the lexical index's top candidates.
+
+The first stage (LexicalIndex.search) ranks chunks by summed term counts,
+which favours long chunks that repeat one word of the question. The
+re-ranker takes its top POH_RERANK_CANDIDATES chunks and scores each on
+several signals at once, computed over NumPy arrays for the whole candidate
+set rather than chunk by chunk:
+
+- coverage: the share of the question's terms the chunk contains
+- proximity: how close together occurrences of different question terms are
+- title match: question terms in the POH section titles on the chunk's pages
+- page-type prior: chunks from the part of the manual the question is about
+  (emergency, operating instructions, servicing, ...) score higher, tables
+  of contents lower
+
+Only the best POH_RERANK_TOP_K chunks are passed on, so the LLM prompt carries
+two or three precise chunks instead of five loosely matching ones.
+"""
+
+import os
+import re
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.chunk_store import PAGE_MARKER
+from src.services.ocr_text import normalize_ocr_text
+from src.services.text_analysis import TextAnalyzer, default_analyzer
+
+POH_RERANK = os.environ.get("POH_RERANK", "True").lower() in ("1", "true", "yes")
+POH_RERANK_CANDIDATES = int(os.environ.get("POH_RERANK_CANDIDATES", "50"))
+POH_RERANK_TOP_K = int(os.environ.get("POH_RERANK_TOP_K", "3"))
+
+# Part of the manual a page belongs to, recognized from its section titles
+# (running headers and footers). The scan garbles many of them, hence the
+# loose patterns; pages without one inherit the type of the page before.
+PAGE_TYPE_CUES = [
+    ("emergency", re.compile(r"EMER\W?GE\S*CY")),
+    ("tips", re.compile(r"G TIPS")),
+    ("performance", re.compile(r"ANCE C\S{0,2}ARTS")),
+    ("servicing", re.compile(r"\bHA\S{0,3}DLI\S{1,3}G A\S{1,3}D SER|SERVICE\b")),
+    ("operating", re.compile(r"OPERATIN\S? ?IN ?STRU")),
+    ("weight", re.compile(r"WEIG\S{1,3}T A\S{1,3}D BA|C\. ?G\. RANGE")),
+    ("systems", re.compile(r"A\S{0,4}D SYSTE")),
+    ("specifications", re.compile(r"SPEC\S*CATIO")),
+    ("flight_manual", re.compile(r"LIMITATIONS|FAA APPROVED|SECTION I")),
+]
+PAGE_TYPES = tuple(name for name, _ in PAGE_TYPE_CUES)
+
+# Parts of the manual that answer each kind of question
+QUESTION_TYPES = [
+    (re.compile(r"\bemergenc|\bfire\b|\bsmoke|fail|\bloss\b|\blost\b|\bspin|\bforced|power.?off|\bditch"
+                r"|\brough", re.I), ("emergency",)),
+    (re.compile(r"\bmax|\bmin(?:imum)?\b|capacity|speed|\bweight|\blimit|\bv[a-z]{1,2}\b|horsepower|\brpm"
+                r"|how (?:much|many|fast|far|high)|ceiling|\brange\b|dimension|placard", re.I),
+     ("specifications", "flight_manual", "performance")),
+    (re.compile(r"how (?:do|to|should)|procedure|\bcheck|\bstart|take.?off|landing|\bclimb|cruis|\btaxi"
+                r"|pre.?flight|warm.?up|run.?up|\bstop|shut.?down|mixture|turbulen|air condition", re.I),
+     ("operating", "tips", "flight_manual")),
+    (re.compile(r"\bclean|servic|\bpark|\bmoor|tie.?down|\btire|\btyre|lubric|\bdrain|\btow|battery|inspect",
+                re.I), ("servicing",)),
+    (re.compile(r"system|how does|\bworks?\b|electrical|vacuum|pitot|landing gear|\bbrake|\bflaps?\b"
+                r"|propeller|instrument|\bseat|door", re.I), ("systems",)),
+    (re.compile(r"\bbalance|center of gravity|\bc\.?g\b|\bweigh(?:ing)?\b|loading|empty weight", re.I),
+     ("weight",)),
+]
+
+# Table of contents lines end in a section page reference ("Preflight ... 7-1")
+CONTENTS_LINE = re.compile(r"(?m)\b[1-9Il]-[0-9IVXLil]{1,4}\.?[ \t]*$")
+CONTENTS_LINES_FULL = 8
+
+# Weights of the signals in the final score. The first-stage score is
+# normalized to the best candidate, the others are in [0, 1] already.
+WEIGHTS = {
+    "first_stage": 0.6,
+    "coverage": 1.5,
+    "proximity": 0.8,
+    "title": 0.6,
+}
+PAGE_TYPE_BOOST = 0.35
+CONTENTS_PENALTY = 0.8
+
+
+@lru_cache(maxsize=4096)
+def question_types(question: str) -> Tuple[int, ...]:
+    """PAGE_TYPES indexes of the parts of the manual that answer ``question``"""
+    wanted = {name for pattern, names in QUESTION_TYPES if pattern.search(question) for name in names}
+    return tuple(sorted(PAGE_TYPES.index(name) for name in wanted))
+
+
+class Reranker:
+    """Per-chunk term arrays, section titles and page types for one chunk list.
+
+    Chunks are added in position order with their analyzed terms (the same
+    terms the lexical index gets), then ``freeze`` packs everything into
+    flat arrays that ``rerank`` slices per candidate set.
+    """
+
+    def __init__(self, sections: Optional[List[Dict]] = None, analyzer: Optional[TextAnalyzer] = None):
+        self.analyzer = analyzer or default_analyzer
+        self.vocabulary: Dict[str, int] = {}
+        self._terms = array("i")
+        self._offsets = array("q", [0])
+        self._title_terms = array("i")
+        self._title_offsets = array("q", [0])
+        self._page_types = array("b")
+        self._contents = array("f")
+        self._current_page = -1
+
+        # Page -> normalized section titles and their term ids
+        self.page_titles: Dict[int, str] = {}
+        page_terms: Dict[int, Dict[int, None]] = {}
+        for section in sections or []:
+            page = section["page"]
+            title = normalize_ocr_text(section["title"]).upper()
+            self.page_titles[page] = f"{self.page_titles[page]}\n{title}" if page in self.page_titles else title
+            ids = page_terms.setdefault(page, {})
+            for term in self.analyzer.analyze(section["title"]):
+                ids.setdefault(self._term_id(term))
+        self.page_terms = {page: list(ids) for page, ids in page_terms.items()}
+
+        # Pages with a cue in page order, and their types
+        self.cue_pages: List[int] = []
+        self.cue_types: List[int] = []
+        for page in sorted(self.page_titles):
+            # The running footer comes last, so the last cue found wins
+            found = [(match.start(), i) for i, (_, cue) in enumerate(PAGE_TYPE_CUES)
+                     for match in cue.finditer(self.page_titles[page])]
+            if found:
+                self.cue_pages.append(page)
+                self.cue_types.append(max(found)[1])
+
+        self.terms = self.offsets = self.title_terms = self.title_offsets = None
+        self.page_types = self.contents = None
+
+    def _term_id(self, term: str) -> int:
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            term_id = self.vocabulary[term] = len(self.vocabulary)
+        return term_id
+
+    def page_type(self, page: int) -> int:
+        """Index into PAGE_TYPES of ``page``, -1 when no page up to it has a cue"""
+        at = bisect_right(self.cue_pages, page) - 1
+        return self.cue_types[at] if at >= 0 else -1
+
+    def add(self, text: str, terms: Iterable[str]):
+        """Append the next chunk: its text and analyzed terms"""
+        for term in terms:
+            self._terms.append(self._term_id(term))
+        self._offsets.append(len(self._terms))
+
+        # Pages the chunk covers: the one it starts on plus every marker in it
+        markers = [int(page) for page in PAGE_MARKER.findall(text)]
+        pages = markers if text.startswith("--- Page") else [self._current_page] + markers
+        if markers:
+            self._current_page = markers[-1]
+
+        titles: Dict[int, None] = {}
+        for page in pages:
+            for term_id in self.page_terms.get(page, ()):
+                titles.setdefault(term_id)
+        self._title_terms.extend(titles)
+        self._title_offsets.append(len(self._title_terms))
+        self._page_types.append(self.page_type(pages[0]) if pages else -1)
+        self._contents.append(min(1.0, len(CONTENTS_LINE.findall(text)) / CONTENTS_LINES_FULL))
+
+    def freeze(self) -> "Reranker":
+        """Pack the added chunks into NumPy arrays; call once after the last ``add``"""
+        self.terms = np.frombuffer(self._terms, dtype=np.int32)
+        self.offsets = np.frombuffer(self._offsets, dtype=np.int64)
+        self.title_terms = np.frombuffer(self._title_terms, dtype=np.int32)
+        self.title_offsets = np.frombuffer(self._title_offsets, dtype=np.int64)
+        self.page_types = np.frombuffer(self._page_types, dtype=np.int8)
+        self.contents = np.frombuffer(self._contents, dtype=np.float32)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def rerank(self, question: str, candidates: Sequence[Tuple[int, float]],
+               top_k: int = POH_RERANK_TOP_K) -> List[Tuple[int, float]]:
+        """Best ``top_k`` of the first stage's (position, score) ``candidates``, rescored"""
+        if len(candidates) <= 1:
+            return list(candidates[:top_k])
+        positions = np.fromiter((position for position, _ in candidates), dtype=np.int64, count=len(candidates))
+        first_stage = np.fromiter((score for _, score in candidates), dtype=np.float64, count=len(candidates))
+
+        # Coverage is measured against the typed terms; a synonym expansion
+        # (MTOW -> maximum gross weight) matches for the term it came from
+        typed = list(dict.fromkeys(self.analyzer.analyze(question)))
+        slots: Dict[int, int] = {}
+        for slot, term in enumerate(typed):
+            if term in self.vocabulary:
+                slots[self.vocabulary[term]] = slot
+        for slot, term in enumerate(typed):
+            for extra in self.analyzer.expansions.get(term, ()):
+                if extra in self.vocabulary:
+                    slots.setdefault(self.vocabulary[extra], slot)
+        query_count = max(len(typed), 1)
+
+        coverage, proximity = self._term_signals(positions, slots, query_count)
+        title = self._title_signal(positions, slots, query_count)
+
+        prior = -CONTENTS_PENALTY * self.contents[positions]
+        wanted = question_types(question)
+        if wanted:
+            prior = prior + PAGE_TYPE_BOOST * np.isin(self.page_types[positions], wanted)
+
+        score = (WEIGHTS["first_stage"] * first_stage / first_stage.max()
+                 + WEIGHTS["coverage"] * coverage
+                 + WEIGHTS["proximity"] * proximity
+                 + WEIGHTS["title"] * title
+                 + prior)
+        # Stable, so ties keep the first stage's order
+        order = np.argsort(-score, kind="stable")[:top_k]
+        return [(int(positions[i]), float(score[i])) for i in order]
+
+    def _gather(self, terms: np.ndarray, offsets: np.ndarray,
+                positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(term ids, owning candidate, offset within the chunk) of the candidates, concatenated"""
+        starts = offsets[positions]
+        lengths = offsets[positions + 1] - starts
+        total = int(lengths.sum())
+        owner = np.repeat(np.arange(len(positions)), lengths)
+        # Offset of each element within its own chunk
+        local = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return terms[starts[owner] + local], owner, local
+
+    def _hits(self, terms: np.ndarray, slots: Dict[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Mask of the elements of ``terms`` that are query terms, and their query slots"""
+        # A vocabulary-sized lookup table is one gather instead of a search per element
+        table = np.full(len(self.vocabulary), -1, dtype=np.int32)
+        table[np.fromiter(slots, dtype=np.int64, count=len(slots))] = list(slots.values())
+        term_slots = table[terms]
+        hit = term_slots >= 0
+        return hit, term_slots[hit]
+
+    def _term_signals(self, positions: np.ndarray, slots: Dict[int, int],
+                      query_count: int) -> Tuple[np.ndarray, np.ndarray]:
+        count = len(positions)
+        if not slots:
+            return np.zeros(count), np.zeros(count)
+        terms, owner, local = self._gather(self.terms, self.offsets, positions)
+        hit, hit_slot = self._hits(terms, slots)
+        hit_owner, hit_local = owner[hit], local[hit]
+
+        # Distinct query terms per candidate
+        pairs = np.unique(hit_owner * query_count + hit_slot)
+        coverage = np.bincount(pairs // query_count, minlength=count) / query_count
+
+        # Closest pair of different query terms next to each other among the
+        # hits: 1 for adjacent words, 1/gap otherwise
+        proximity = np.zeros(count)
+        if len(hit_owner) > 1:
+            pair = (hit_owner[1:] == hit_owner[:-1]) & (hit_slot[1:] != hit_slot[:-1])
+            np.maximum.at(proximity, hit_owner[1:][pair], 1.0 / np.diff(hit_local)[pair])
+        return coverage, proximity
+
+    def _title_signal(self, positions: np.ndarray, slots: Dict[int, int], query_count: int) -> np.ndarray:
+        count = len(positions)
+        if not slots or not len(self.title_terms):
+            return np.zeros(count)
+        terms, owner, _ = self._gather(self.title_terms, self.title_offsets, positions)
+        hit, hit_slot = self._hits(terms, slots)
+        pairs = np.unique(owner[hit] * query_count + hit_slot)
+        return np.bincount(pairs // query_count, minlength=count) / query_count
@@ -0,0 +1,430 @@
+"""
+Shared Corpus
+Read-only corpus segments in POSIX shared memory.
+
+Under gunicorn one process publishes a corpus (the POH in the master, an
+uploaded document in whichever worker received it) and every worker maps
+the same bytes instead of holding its own copy. Each channel ("poh",
+"document") has a small control segment naming the current data segment;
+publishing writes a complete new segment and then swaps the control record,
+so readers always see one consistent version.
+
+Enabled with SHARED_CORPUS=1 (gunicorn.conf.py turns it on).
+"""
+
+import json
+import os
+import struct
+import tempfile
+from collections.abc import Mapping, Sequence
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+SEGMENT_MAGIC = b"ADACORP1"
+CONTROL_MAGIC = b"ADACTL01"
+CONTROL_SIZE = 128
+MAX_NAME_LENGTH = 64
+
+# Segment: magic, version, header length, then the JSON header and data sections
+SEGMENT_HEADER = struct.Struct("<8sQQ")
+# Control: magic, sequence (odd while being written), version, name length, name
+CONTROL_HEADER = struct.Struct("<8sQQH")
+OFFSET = struct.Struct("<Q")
+
+
+def is_enabled() -> bool:
+    return os.environ.get("SHARED_CORPUS", "").lower() in ("1", "true", "yes", "on")
+
+
+def _prefix() -> str:
+    return os.environ.get("SHARED_CORPUS_PREFIX", "ada")
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """Open a segment whose lifetime we manage ourselves.
+
+    The multiprocessing resource tracker would otherwise unlink segments when
+    the process that opened them exits, pulling the corpus out from under the
+    other workers.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:  # Python < 3.13 has no ``track`` argument
+        segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+        try:
+            resource_tracker.unregister(segment._name, "shared_memory")
+        except Exception:
+            pass
+        return segment
+
+
+def _unlink(name: str):
+    # A tracked open pairs with the unregister that unlink() performs
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+class _PublishLock:
+    """Serializes publishers of one channel across processes"""
+
+    def __init__(self, channel: str):
+        self.path = os.path.join(tempfile.gettempdir(), f"{_prefix()}-{channel}.lock")
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _control_name(channel: str) -> str:
+    return f"{_prefix()}-{channel}"
+
+
+def _read_control(buf) -> Tuple[int, str]:
+    """Read (version, segment name) from a control segment, seqlock style"""
+    for _ in range(1000):
+        magic, seq, version, length = CONTROL_HEADER.unpack_from(buf, 0)
+        if magic != CONTROL_MAGIC:
+            return 0, ""
+        if seq % 2:
+            continue
+        name = bytes(buf[CONTROL_HEADER.size:CONTROL_HEADER.size + length]).decode("ascii")
+        if OFFSET.unpack_from(buf, 8)[0] == seq:
+            return version, name
+    raise RuntimeError("Shared corpus control record is not settling")
+
+
+def _write_control(buf, version: int, name: str):
+    encoded = name.encode("ascii")
+    seq = OFFSET.unpack_from(buf, 8)[0]
+    OFFSET.pack_into(buf, 8, seq + 1)
+    buf[CONTROL_HEADER.size:CONTROL_HEADER.size + len(encoded)] = encoded
+    struct.pack_into("<QH", buf, 16, version, len(encoded))
+    OFFSET.pack_into(buf, 8, seq + 2)
+
+
+def _encode(version: int, meta: Dict, texts: Dict[str, List[str]], blobs: Dict[str, bytes]) -> bytes:
+    sections = bytearray()
+    text_index, blob_index = {}, {}
+
+    for name, values in texts.items():
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = [0]
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+        offsets_at = len(sections)
+        sections += b"".join(OFFSET.pack(offset) for offset in offsets)
+        text_index[name] = [offsets_at, len(encoded), len(sections)]
+        sections += b"".join(encoded)
+
+    for name, data in blobs.items():
+        blob_index[name] = [len(sections), len(data)]
+        sections += data
+
+    header = json.dumps({"meta": meta, "texts": text_index, "blobs": blob_index}).encode("utf-8")
+    header += b" " * (-len(header) % 8)
+    return SEGMENT_HEADER.pack(SEGMENT_MAGIC, version, len(header)) + header + bytes(sections)
+
+
+def publish(channel: str, meta: Dict, texts: Optional[Dict[str, List[str]]] = None,
+            blobs: Optional[Dict[str, bytes]] = None) -> int:
+    """Publish a new version of ``channel`` and return its version number"""
+    with _PublishLock(channel):
+        try:
+            control = _open_segment(_control_name(channel))
+        except FileNotFoundError:
+            control = _open_segment(_control_name(channel), create=True, size=CONTROL_SIZE)
+            CONTROL_HEADER.pack_into(control.buf, 0, CONTROL_MAGIC, 0, 0, 0)
+
+        try:
+            previous_version, previous_name = _read_control(control.buf)
+            version = previous_version + 1
+            name = f"{_prefix()}-{channel}-{version}"
+            if len(name) > MAX_NAME_LENGTH:
+                raise ValueError(f"Shared segment name too long: {name}")
+
+            payload = _encode(version, meta, texts or {}, blobs or {})
+            segment = _open_segment(name, create=True, size=len(payload))
+            segment.buf[:len(payload)] = payload
+            segment.close()
+
+            _write_control(control.buf, version, name)
+        finally:
+            control.close()
+
+        # Readers that already mapped the old version keep their mapping
+        if previous_name:
+            _unlink(previous_name)
+        return version
+
+
+def unpublish(channel: str):
+    """Remove a channel's current segment and control record"""
+    with _PublishLock(channel):
+        try:
+            control = _open_segment(_control_name(channel))
+        except FileNotFoundError:
+            return
+        _, name = _read_control(control.buf)
+        control.close()
+        if name:
+            _unlink(name)
+        _unlink(_control_name(channel))
+
+
+class SharedTextList(Sequence):
+    """Strings stored in a segment, decoded on access"""
+
+    def __init__(self, buf, offsets_at: int, count: int, data_at: int):
+        self._buf = buf
+        self._offsets_at = offsets_at
+        self._count = count
+        self._data_at = data_at
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start, end = struct.unpack_from("<QQ", self._buf, self._offsets_at + OFFSET.size * index)
+        return str(self._buf[self._data_at + start:self._data_at + end], "utf-8")
+
+
+class SharedSegment:
+    """A mapped, read-only corpus segment"""
+
+    def __init__(self, name: str):
+        self._segment = _open_segment(name)
+        buf = self._segment.buf
+        magic, self.version, header_length = SEGMENT_HEADER.unpack_from(buf, 0)
+        if magic != SEGMENT_MAGIC:
+            self._segment.close()
+            raise ValueError(f"{name} is not a corpus segment")
+
+        header_end = SEGMENT_HEADER.size + header_length
+        header = json.loads(bytes(buf[SEGMENT_HEADER.size:header_end]))
+        self.name = name
+        self.meta = header["meta"]
+        self._texts = header["texts"]
+        self._blobs = header["blobs"]
+        self._base = header_end
+
+    def text(self, name: str) -> SharedTextList:
+        offsets_at, count, data_at = self._texts[name]
+        return SharedTextList(self._segment.buf, self._base + offsets_at, count, self._base + data_at)
+
+    def has_blob(self, name: str) -> bool:
+        return name in self._blobs
+
+    def blob(self, name: str) -> bytes:
+        offset, length = self._blobs[name]
+        return bytes(self._segment.buf[self._base + offset:self._base + offset + length])
+
+    def close(self):
+        try:
+            self._segment.close()
+        except BufferError:
+            # Someone still holds a view into the old version; the mapping is
+            # released when it is garbage collected
+            pass
+
+
+class SharedCorpusReader:
+    """Follows the current version of one channel"""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.segment: Optional[SharedSegment] = None
+        self.version = 0
+        self._control = None
+
+    def poll(self) -> bool:
+        """Attach a newer version if one was published; True when swapped"""
+        if self._control is None:
+            try:
+                self._control = _open_segment(_control_name(self.channel))
+            except FileNotFoundError:
+                return False
+
+        version, name = _read_control(self._control.buf)
+        if not name or version == self.version:
+            return False
+        try:
+            segment = SharedSegment(name)
+        except FileNotFoundError:
+            # Replaced again while we were looking; the next poll picks it up
+            return False
+
+        previous, self.segment, self.version = self.segment, segment, segment.version
+        if previous is not None:
+            previous.close()
+        return True
+
+
+class SharedChunk(Mapping):
+    """Chunk record backed by a segment; metadata is decoded on first use"""
+
+    __slots__ = ("_chunks", "_index", "_metadata")
+
+    def __init__(self, chunks: "SharedChunkList", index: int):
+        self._chunks = chunks
+        self._index = index
+        self._metadata = None
+
+    def __getitem__(self, key):
+        if key == "text":
+            return self._chunks.texts[self._index]
+        if key == "id":
+            return self._chunks.ids[self._index]
+        if key == "metadata":
+            if self._metadata is None:
+                self._metadata = json.loads(self._chunks.metadata[self._index])
+            return self._metadata
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("id", "text", "metadata"))
+
+    def __len__(self) -> int:
+        return 3
+
+
+class SharedChunkList(Sequence):
+    """A chunk list (POH or uploaded document) as stored in a segment"""
+
+    def __init__(self, segment: SharedSegment):
+        self.ids = segment.text("chunk_ids")
+        self.texts = segment.text("chunk_texts")
+        self.metadata = segment.text("chunk_metadata")
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return SharedChunk(self, index)
+
+
+class SharedPageList(Sequence):
+    def __init__(self, segment: SharedSegment):
+        self.numbers = segment.meta["page_numbers"]
+        self.texts = segment.text("pages")
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {"page_number": self.numbers[index], "text": self.texts[index]}
+
+
+class SharedPageMap(Mapping):
+    """Page number -> text of a published document, decoded on access"""
+
+    def __init__(self, segment: SharedSegment):
+        self.numbers = segment.meta["page_numbers"]
+        self.texts = segment.text("pages")
+        self._positions = {number: position for position, number in enumerate(self.numbers)}
+
+    def __getitem__(self, number):
+        return self.texts[self._positions[number]]
+
+    def __iter__(self):
+        return iter(self.numbers)
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+
+def _chunk_texts(chunks: Sequence) -> Dict[str, List[str]]:
+    return {
+        "chunk_ids": [chunk["id"] for chunk in chunks],
+        "chunk_texts": [chunk["text"] for chunk in chunks],
+        "chunk_metadata": [json.dumps(chunk.get("metadata", {})) for chunk in chunks],
+    }
+
+
+def publish_poh(content: Dict, chunks: List[Dict]) -> int:
+    """Publish processed POH content and chunks on the "poh" channel"""
+    meta = {
+        "title": content["title"],
+        "subtitle": content["subtitle"],
+        "sections": content["sections"],
+        "page_numbers": [page["page_number"] for page in content["pages"]],
+    }
+    texts = {"pages": [page["text"] for page in content["pages"]], **_chunk_texts(chunks)}
+    return publish("poh", meta, texts)
+
+
+def publish_poh_from_dir(data_dir: str) -> Optional[int]:
+    """Load poh_content.json and poh_chunks.json from ``data_dir`` and publish them"""
+    content_path = os.path.join(data_dir, "poh_content.json")
+    chunks_path = os.path.join(data_dir, "poh_chunks.json")
+    if not (os.path.exists(content_path) and os.path.exists(chunks_path)):
+        print(f"Warning: no POH data in {data_dir}, shared corpus not published")
+        return None
+
+    with open(content_path, 'r') as f:
+        content = json.load(f)
+    with open(chunks_path, 'r') as f:
+        chunks = json.load(f)
+    version = publish_poh(content, chunks)
+    print(f"Published shared POH corpus v{version}: {len(content['pages'])} pages, {len(chunks)} chunks")
+    return version
+
+
+def poh_from_segment(segment: SharedSegment) -> Tuple[Dict, SharedChunkList]:
+    """Content dict and chunk list views over a published POH segment"""
+    content = {
+        "title": segment.meta["title"],
+        "subtitle": segment.meta["subtitle"],
+        "sections": segment.meta["sections"],
+        "pages": SharedPageList(segment),
+    }
+    return content, SharedChunkList(segment)
+
+
+def publish_document(title: Optional[str], pages: Mapping, chunks: Sequence,
+                     vector_store: Optional[bytes] = None) -> int:
+    """Publish the current uploaded document (or its absence) on the "document" channel.
+
+    ``pages`` maps page numbers to text and ``chunks`` are the document's
+    chunk records in page order; readers serve both from the segment.
+    """
+    numbers = sorted(pages)
+    meta = {"title": title, "loaded": title is not None, "page_numbers": numbers}
+    texts = {"pages": [pages[number] for number in numbers], **_chunk_texts(chunks)}
+    blobs = {"vector_store": vector_store} if vector_store is not None else {}
+    return publish("document", meta, texts, blobs)
+
+
+def document_from_segment(segment: SharedSegment) -> Tuple[str, SharedPageMap, SharedChunkList]:
+    """(title, page map, chunk list) views over a published document segment"""
+    return segment.meta["title"], SharedPageMap(segment), SharedChunkList(segment)
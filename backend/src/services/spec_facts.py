@@ -0,0 +1,230 @@
+"""
+Spec Facts
+Precomputed table of the POH's single-valued specifications.
+
+Questions such as "What is the maximum gross weight?" have one number for an
+answer, stated on a specification or limitations page. An offline step
+(``python -m src.services.spec_facts [data_dir]``) runs the extraction
+patterns below over ``poh_content.json`` and writes ``poh_facts.json``: one
+entry per fact key with its quantity, value, unit, page and the matched
+text. At query time the question is reduced to a canonical key (analyzed
+terms, abbreviations expanded, filler words dropped) and looked up in a dict
+of known phrasings, so the common spec questions are answered with a page
+citation before any retrieval or LLM call.
+"""
+
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.services.ocr_text import normalize_ocr_text
+from src.services.text_analysis import TextAnalyzer, default_analyzer
+
+FACTS_FILENAME = "poh_facts.json"
+
+# Fact key -> what it is, its unit and the questions that ask for it
+FACT_SPECS = {
+    "max_gross_weight": {
+        "quantity": "maximum gross weight", "unit": "lbs",
+        "questions": ["What is the maximum gross weight?", "max gross weight", "MTOW",
+                      "What is the maximum takeoff weight?", "What is the gross weight?",
+                      "What is the maximum weight?", "How heavy can the airplane be?"],
+    },
+    "fuel_capacity": {
+        "quantity": "total fuel capacity", "unit": "U.S. gallons",
+        "questions": ["What is the fuel capacity?", "What is the total fuel capacity?",
+                      "How much fuel does it hold?", "How many gallons of fuel?",
+                      "How much fuel can the tanks hold?"],
+    },
+    "main_tank_capacity": {
+        "quantity": "capacity of each main (inboard) tank", "unit": "U.S. gallons",
+        "questions": ["What is the main tank capacity?", "How much fuel does each main tank hold?",
+                      "What is the inboard tank capacity?"],
+    },
+    "tip_tank_capacity": {
+        "quantity": "capacity of each tip tank", "unit": "U.S. gallons",
+        "questions": ["What is the tip tank capacity?", "How much fuel does each tip tank hold?"],
+    },
+    "oil_capacity": {
+        "quantity": "oil capacity", "unit": "U.S. quarts",
+        "questions": ["What is the oil capacity?", "How much oil does the engine hold?",
+                      "How many quarts of oil?"],
+    },
+    "horsepower": {
+        "quantity": "rated engine power", "unit": "hp",
+        "questions": ["What is the horsepower?", "How much horsepower does the engine have?",
+                      "What is the engine horsepower?", "How powerful is the engine?"],
+    },
+    "max_rpm": {
+        "quantity": "maximum engine speed", "unit": "rpm",
+        "questions": ["What is the maximum rpm?", "What is the redline rpm?", "What is the rated rpm?",
+                      "What is the engine speed limit?"],
+    },
+    "vfe": {
+        "quantity": "maximum flap extended speed (Vfe)", "unit": "mph",
+        "questions": ["What is the maximum flap extended speed?", "What is Vfe?",
+                      "What is the flap speed?"],
+    },
+    "stall_speed_clean": {
+        "quantity": "stalling speed, flaps up", "unit": "mph CAS",
+        "questions": ["What is the stall speed?", "What is the stall speed with flaps up?",
+                      "What is the clean stall speed?", "What is Vs1?"],
+    },
+    "stall_speed_landing": {
+        "quantity": "stalling speed, flaps down (Vso)", "unit": "mph CAS",
+        "questions": ["What is the stall speed with flaps down?", "What is Vso?",
+                      "What is the landing configuration stall speed?"],
+    },
+    "vy": {
+        "quantity": "best rate of climb speed (Vy)", "unit": "mph",
+        "questions": ["What is the best rate of climb speed?", "What is Vy?"],
+    },
+    "vx": {
+        "quantity": "best angle of climb speed (Vx)", "unit": "mph",
+        "questions": ["What is the best angle of climb speed?", "What is Vx?"],
+    },
+    "rate_of_climb": {
+        "quantity": "sea level rate of climb at gross weight", "unit": "ft per min",
+        "questions": ["What is the rate of climb?", "How fast does it climb?"],
+    },
+    "cruise_speed": {
+        "quantity": "cruise speed at 75% power, 8,300 ft (TAS)", "unit": "mph",
+        "questions": ["What is the cruise speed?", "How fast does it cruise?", "What is the cruising speed?",
+                      "How fast does the airplane fly?"],
+    },
+    "service_ceiling": {
+        "quantity": "service ceiling at gross weight", "unit": "ft",
+        "questions": ["What is the service ceiling?", "How high can it fly?"],
+    },
+    "absolute_ceiling": {
+        "quantity": "absolute ceiling at gross weight", "unit": "ft",
+        "questions": ["What is the absolute ceiling?"],
+    },
+    "takeoff_ground_run": {
+        "quantity": "takeoff ground run, 10 degrees flaps, sea level", "unit": "ft",
+        "questions": ["What is the takeoff ground run?", "What is the takeoff distance?",
+                      "How much runway is needed for takeoff?"],
+    },
+}
+
+# Patterns over normalized page text, in order of preference; each named
+# group captures the value of the fact key it is named after, and the match is
+# quoted back as the fact's evidence. Only statements that put a label and its
+# value in one run of text qualify: the spec tables on pages 8 and 37 came
+# out of OCR with labels and values in separate runs, so empty weight, useful
+# load, Vne, Vno and Va have no entry here and are left to retrieval.
+# Patterns anchor on wording, never on a known value.
+EXTRACTORS = [
+    re.compile(r"MAXIMUM WEI\S* (?P<max_gross_weight>\d{4}) LBS"),
+    re.compile(r"GROSS \S*EIGHTS (?P<max_gross_weight>\d{4})"),
+    re.compile(r"standard fuel capacity of the [\w ]+? is (?P<fuel_capacity>\d+) gallons"),
+    re.compile(r"main inboard tanks, which hold\s+(?P<main_tank_capacity>\d+) gallons each"),
+    re.compile(r"each one holds (?P<tip_tank_capacity>\d+) gallons"),
+    re.compile(r"Oil \( ?(?P<oil_capacity>\d+) quarts\)"),
+    re.compile(r"rated at (?P<horsepower>\d+) horsepower at (?P<max_rpm>\d+) rpm"),
+    re.compile(r"For all operations (?P<max_rpm>\d+) RPM, ?(?P<horsepower>\d+) HP"),
+    re.compile(r"flaps can be lowered at speeds up to (?P<vfe>\d+) miles per hour"),
+    re.compile(r"Flaps Up - (?P<stall_speed_clean>\d+)\s+Flaps Down - (?P<stall_speed_landing>\d+)"),
+    re.compile(r"Best Rate of Climb Speed \(mp\w*\W? (?P<vy>\d+)"),
+    re.compile(r"Best Angle of Climb Speed \(mph\) (?P<vx>\d+)"),
+    re.compile(r"\nRate of Climb \(ft per min\) (?P<rate_of_climb>\d+)"),
+    re.compile(r"Optimum Altitude, ?[\d,]+ ft, ?75\S* power ?\(TAS\) \(mph\) (?P<cruise_speed>\d+)"),
+    re.compile(r"Service Ceil\w* \(ft\) (?P<service_ceiling>\d{1,2},\d{3})"),
+    re.compile(r"Absolute Ceiling \(ft\) (?P<absolute_ceiling>\d{1,2},\d{3})"),
+    re.compile(r"Takeoff Ground Run, [^\n]*?\(ft\) (?P<takeoff_ground_run>\d+)"),
+]
+
+WHITESPACE = re.compile(r"\s+")
+
+# Words that do not change which fact is asked for ("... of the Cherokee Six")
+FILLER_WORDS = ("airplane aircraft plane cherokee six piper pa pa32300 300 poh handbook "
+                "value specification spec number figure")
+
+
+def build_fact_table(pages: Iterable[Dict]) -> Dict[str, Dict]:
+    """Run EXTRACTORS over ``pages`` ({"page_number", "text"} dicts).
+
+    A fact comes from the first extractor that finds it, on the first page
+    it matches.
+    """
+    texts = [(page["page_number"], normalize_ocr_text(page["text"])) for page in pages]
+    facts: Dict[str, Dict] = {}
+    for pattern in EXTRACTORS:
+        for number, text in texts:
+            for match in pattern.finditer(text):
+                for key, raw in match.groupdict().items():
+                    if raw is None or key in facts:
+                        continue
+                    spec = FACT_SPECS[key]
+                    facts[key] = {
+                        "quantity": spec["quantity"],
+                        "value": raw,
+                        "unit": spec["unit"],
+                        "page": number,
+                        "evidence": WHITESPACE.sub(" ", match.group(0)).strip(),
+                    }
+    return {key: facts[key] for key in FACT_SPECS if key in facts}
+
+
+class SpecFactTable:
+    """Fact table with an intent lookup from question phrasings to fact keys"""
+
+    def __init__(self, facts: Dict[str, Dict], analyzer: Optional[TextAnalyzer] = None,
+                 cache_size: int = 4096):
+        # Only facts quoted from the POH are served; the rest go to retrieval
+        self.facts = {key: fact for key, fact in facts.items() if key in FACT_SPECS and fact.get("evidence")}
+        self.analyzer = analyzer or default_analyzer
+        self.filler = frozenset(self.analyzer.analyze(FILLER_WORDS))
+        self.intents: Dict[frozenset, str] = {}
+        for key, spec in FACT_SPECS.items():
+            if key in self.facts:
+                for question in spec["questions"]:
+                    self.intents.setdefault(self.intent_key(question), key)
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @classmethod
+    def from_file(cls, path: str) -> "SpecFactTable":
+        with open(path, 'r') as f:
+            return cls(json.load(f)["facts"])
+
+    def intent_key(self, question: str) -> frozenset:
+        """Analyzed question terms with abbreviations expanded and filler dropped"""
+        terms = set()
+        for term in self.analyzer.analyze(question):
+            terms.update(self.analyzer.expansions.get(term) or (term,))
+        return frozenset(terms - self.filler)
+
+    def _lookup(self, question: str) -> Optional[Tuple[str, Dict]]:
+        key = self.intents.get(self.intent_key(question))
+        return (key, self.facts[key]) if key else None
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+
+def format_fact(fact: Dict, source: str) -> str:
+    """Answer text for a fact, citing its page and quoting the text it was read from"""
+    return (f"According to {source} (page {fact['page']}), the {fact['quantity']} is "
+            f"{fact['value']} {fact['unit']}.\n\n\"{fact['evidence']}\"")
+
+
+def write_fact_table(data_dir: str) -> str:
+    """Extract the facts of ``data_dir``/poh_content.json into poh_facts.json"""
+    with open(os.path.join(data_dir, "poh_content.json"), 'r') as f:
+        content = json.load(f)
+    facts = build_fact_table(content["pages"])
+    path = os.path.join(data_dir, FACTS_FILENAME)
+    with open(path, 'w') as f:
+        json.dump({"title": content["title"], "facts": facts}, f, indent=2)
+        f.write("\n")
+    missing = sorted(set(FACT_SPECS) - set(facts))
+    print(f"Wrote {len(facts)} facts to {path}" + (f" (not found: {', '.join(missing)})" if missing else ""))
+    return path
+
+
+if __name__ == "__main__":
+    write_fact_table(sys.argv[1] if len(sys.argv) > 1 else
+                     os.environ.get("POH_DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "data")))
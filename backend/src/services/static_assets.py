@@ -0,0 +1,210 @@
+"""
+Static Assets
+Serves the frontend build from an in-memory manifest.
+
+The static folder is scanned once at startup: every file gets a content hash
+(its ETag), a content type and its compressed variants, either prebuilt
+``.br``/``.gz`` files next to it (``python -m src.services.static_assets
+<static dir>`` writes them at build time) or, failing that, a gzip copy made
+in memory. Requests are answered from the manifest without touching the
+filesystem for lookups: hashed build assets under ``assets/``
+(``assets/index-DJ6C0Gru.js``) are cached by browsers for a year as
+immutable, everything else is
+revalidated with If-None-Match and costs a 304 when unchanged. Unknown paths
+get index.html for client-side routing.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from typing import Dict, Optional
+
+from flask import Response, jsonify, request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli variants are optional; gzip is always built
+    brotli = None
+
+# Vite writes hashed build outputs to assets/ as "<name>-<8 character hash>.<ext>";
+# files copied from public/ keep their names ("site-manifest.json",
+# "apple-touch-icon.png") and must stay revalidated
+HASHED_ASSET = re.compile(r"^assets/(?:[^/]+/)*[^/]+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml",
+                      "image/x-icon", "image/vnd.microsoft.icon", "application/manifest+json")
+MIN_COMPRESS_BYTES = 1024
+
+# Preference order when the client accepts several
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class StaticAsset:
+    """One file of the manifest and its compressed variants"""
+
+    __slots__ = ("path", "content_type", "etag", "cache_control", "size", "variants")
+
+    def __init__(self, path: str, content_type: str, etag: str, cache_control: str, size: int):
+        self.path = path
+        self.content_type = content_type
+        self.etag = etag
+        self.cache_control = cache_control
+        self.size = size
+        # encoding -> file path (prebuilt) or bytes (compressed at startup)
+        self.variants: Dict[str, object] = {}
+
+
+def _compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _content_type(path: str) -> str:
+    # Flask adds "; charset=utf-8" to text types
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+class StaticManifest:
+    """Path -> StaticAsset for everything under a static folder"""
+
+    def __init__(self, root: str, compress: bool = True):
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+        if root and os.path.isdir(root):
+            self.scan(compress)
+
+    def scan(self, compress: bool = True):
+        variant_suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        assets = {}
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(variant_suffixes):
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, self.root).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    data = f.read()
+                content_type = _content_type(name)
+                asset = StaticAsset(
+                    path, content_type,
+                    etag=hashlib.blake2b(data, digest_size=10).hexdigest(),
+                    cache_control=IMMUTABLE_CACHE if HASHED_ASSET.match(relative) else REVALIDATE_CACHE,
+                    size=len(data),
+                )
+                for encoding, suffix in ENCODINGS:
+                    # A variant older than its source was built from a previous version
+                    if os.path.exists(path + suffix) and os.path.getmtime(path + suffix) >= os.path.getmtime(path):
+                        asset.variants[encoding] = path + suffix
+                if compress and not asset.variants and len(data) >= MIN_COMPRESS_BYTES \
+                        and _compressible(content_type):
+                    compressed = gzip.compress(data, 9, mtime=0)
+                    if len(compressed) < len(data):
+                        asset.variants["gzip"] = compressed
+                assets[relative] = asset
+        self.assets = assets
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path)
+
+    @property
+    def index(self) -> Optional[StaticAsset]:
+        return self.assets.get("index.html")
+
+    def stats(self) -> Dict:
+        return {
+            "files": len(self.assets),
+            "bytes": sum(asset.size for asset in self.assets.values()),
+            "immutable": sum(asset.cache_control == IMMUTABLE_CACHE for asset in self.assets.values()),
+            "precompressed": sum(any(isinstance(variant, str) for variant in asset.variants.values())
+                                 for asset in self.assets.values()),
+        }
+
+
+def _negotiate(asset: StaticAsset) -> Optional[str]:
+    """The best encoding that both the client accepts and the asset has"""
+    if not asset.variants:
+        return None
+    accepted = request.accept_encodings
+    for encoding, _ in ENCODINGS:
+        if encoding in asset.variants and accepted[encoding] > 0:
+            return encoding
+    return None
+
+
+def asset_response(asset: StaticAsset) -> Response:
+    """200 with the best variant of ``asset``, or 304 when the client's copy is current"""
+    encoding = _negotiate(asset)
+    # Each representation has its own validator
+    etag = f"{asset.etag}-{encoding}" if encoding else asset.etag
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        body = asset.variants[encoding] if encoding else asset.path
+        if isinstance(body, bytes):
+            response = Response(body, mimetype=asset.content_type)
+        else:
+            # File bodies go out through the server's file wrapper (sendfile)
+            response = send_file(body, mimetype=asset.content_type, conditional=False,
+                                 etag=False, max_age=None)
+            # send_file names the variant file ("index.js.gz")
+            response.headers.pop("Content-Disposition", None)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = asset.cache_control
+    if asset.variants:
+        response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_static_assets(app, manifest: Optional[StaticManifest] = None):
+    """Serve ``app.static_folder`` at / through a manifest built now"""
+    manifest = manifest or StaticManifest(app.static_folder)
+    app.extensions["static_manifest"] = manifest
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        asset = manifest.get(path) if path else None
+        if asset is None:
+            # Client-side routes fall through to the single page app
+            asset = manifest.index
+            if asset is None:
+                return jsonify({'error': 'Frontend not found'}), 404
+        return asset_response(asset)
+
+    return manifest
+
+
+def precompress(root: str, min_bytes: int = MIN_COMPRESS_BYTES) -> int:
+    """Write .gz (and, with the brotli package, .br) files next to compressible assets"""
+    written = 0
+    manifest = StaticManifest(root, compress=False)
+    for asset in manifest.assets.values():
+        if asset.size < min_bytes or not _compressible(asset.content_type):
+            continue
+        with open(asset.path, "rb") as f:
+            data = f.read()
+        variants = [(".gz", gzip.compress(data, 9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                with open(asset.path + suffix, "wb") as f:
+                    f.write(compressed)
+                written += 1
+    if brotli is None:
+        print("Warning: brotli is not installed, only gzip variants were written")
+    return written
+
+
+if __name__ == "__main__":
+    for folder in sys.argv[1:]:
+        print(f"{folder}: wrote {precompress(folder)} compressed variants")
@@ -0,0 +1,349 @@
+"""
+Text Analysis
+Shared tokenization, stopword removal, stemming and aviation synonym
+expansion for queries and for the indexes that answer them.
+
+Indexing and querying must agree on terms, so both go through the same
+TextAnalyzer: ``analyze`` for document text, ``analyze_query`` (cached) for
+questions, which additionally expands abbreviations such as MTOW.
+"""
+
+import heapq
+import re
+from functools import lru_cache
+from typing import Callable, Collection, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from src.services.fuzzy_index import DeletionIndex
+from src.services.ocr_text import normalize_ocr_text
+
+# Words joined by hyphens count as one term ("take-off" == "takeoff")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+# A token at a known position plus the word after it (for split compounds)
+WORD_AT = re.compile(r"([a-z0-9]+(?:-[a-z0-9]+)*)(?:[^a-z0-9]+([a-z0-9]+))?")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because
+been before being below between both but by can could did do does doing during
+each either few for from further had has have having he her here hers him his
+how i if in into is it its itself just me more most my myself nor now of once
+only or other our ours out own please same she should so some such tell than
+that the their theirs them then there these they this those through to too
+until very was we were what when where which while who whom why will with
+would you your yours
+""".split())
+
+# Two-word forms of compounds that the POH also writes as one word
+COMPOUNDS = {
+    ("take", "off"): "takeoff",
+    ("touch", "down"): "touchdown",
+    ("run", "up"): "runup",
+    ("lift", "off"): "liftoff",
+    ("tie", "down"): "tiedown",
+    ("air", "speed"): "airspeed",
+    ("cross", "wind"): "crosswind",
+}
+
+# Aviation abbreviations and the terms they stand for. Queries containing the
+# abbreviation also search the expansion, and vice versa.
+AVIATION_SYNONYMS = {
+    "mtow": "maximum gross weight",
+    "gw": "gross weight",
+    "max": "maximum",
+    "min": "minimum",
+    "cg": "center of gravity",
+    "rpm": "revolutions per minute",
+    "mp": "manifold pressure",
+    "cht": "cylinder head temperature",
+    "egt": "exhaust gas temperature",
+    "oat": "outside air temperature",
+    "ias": "indicated airspeed",
+    "cas": "calibrated airspeed",
+    "tas": "true airspeed",
+    "mph": "miles per hour",
+    "kts": "knots",
+    "gph": "gallons per hour",
+    "gal": "gallons",
+    "lbs": "pounds",
+    "lb": "pounds",
+    "hp": "horsepower",
+    "bhp": "brake horsepower",
+    "vne": "never exceed speed",
+    "vno": "maximum structural cruising speed",
+    "vfe": "maximum flap extended speed",
+    "va": "maneuvering speed",
+    "vx": "best angle of climb speed",
+    "vy": "best rate of climb speed",
+    "vso": "stalling speed landing configuration",
+    "elt": "emergency locator transmitter",
+    "vfr": "visual flight rules",
+    "ifr": "instrument flight rules",
+    "msl": "mean sea level",
+    "agl": "above ground level",
+    "nm": "nautical miles",
+    "poh": "pilot's operating handbook",
+}
+
+_VOWELS = frozenset("aeiouy")
+
+
+def _has_vowel(word: str) -> bool:
+    return any(ch in _VOWELS for ch in word)
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Light suffix stripping: plurals, -ing, -ed and a final -e.
+
+    Deliberately conservative; it only has to map inflections of the same
+    word onto one term, not produce dictionary forms.
+    """
+    if len(word) <= 3 or not word.isalpha():
+        return word
+
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith(("sses", "shes", "ches", "xes", "zes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix):
+            base = word[:-len(suffix)]
+            if len(base) >= 3 and _has_vowel(base) and not (suffix == "ed" and base.endswith("e")):
+                if len(base) > 3 and base[-1] == base[-2] and base[-1] not in "lsz":
+                    base = base[:-1]
+                word = base
+            break
+
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+class TextAnalyzer:
+    """Compiled, cached analysis pipeline shared by queries and indexers"""
+
+    def __init__(self, stopwords: Iterable[str] = STOPWORDS,
+                 synonyms: Optional[Dict[str, str]] = None,
+                 compounds: Optional[Dict[Tuple[str, str], str]] = None,
+                 normalizer: Optional[Callable[[str], str]] = normalize_ocr_text,
+                 query_cache_size: int = 4096):
+        self.stopwords = frozenset(stopwords)
+        self.normalizer = normalizer
+        self.compounds = COMPOUNDS if compounds is None else compounds
+        synonyms = AVIATION_SYNONYMS if synonyms is None else synonyms
+
+        # Pre-analyze the synonym table once: abbreviation -> expansion terms,
+        # and expansion phrase -> abbreviation term for the reverse direction
+        self.expansions: Dict[str, Tuple[str, ...]] = {}
+        self.phrases: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        for abbreviation, expansion in synonyms.items():
+            terms = tuple(self.analyze(expansion))
+            key = stem(abbreviation)
+            self.expansions[key] = terms
+            if terms:
+                self.phrases[terms] = self.phrases.get(terms, ()) + (key,)
+        self._max_phrase = max((len(phrase) for phrase in self.phrases), default=0)
+
+        self.analyze_query = lru_cache(maxsize=query_cache_size)(self._analyze_query)
+        self.term_prefixes = lru_cache(maxsize=query_cache_size)(self._term_prefixes)
+
+    def tokens(self, text: str) -> List[str]:
+        """Lowercased word tokens with hyphenated and split compounds joined"""
+        raw = [token.replace("-", "") for token in TOKEN_PATTERN.findall(text.lower())]
+        if not self.compounds:
+            return raw
+
+        tokens = []
+        i = 0
+        while i < len(raw):
+            joined = self.compounds.get((raw[i], raw[i + 1])) if i + 1 < len(raw) else None
+            if joined:
+                tokens.append(joined)
+                i += 2
+            else:
+                tokens.append(raw[i])
+                i += 1
+        return tokens
+
+    def analyze(self, text: str) -> List[str]:
+        """Index terms for ``text``: normalized tokens minus stopwords, stemmed"""
+        if self.normalizer is not None:
+            text = self.normalizer(text)
+        stopwords = self.stopwords
+        return [
+            stem(token) for token in self.tokens(text)
+            if token not in stopwords and (len(token) > 1 or token.isdigit())
+        ]
+
+    def _analyze_query(self, query: str) -> Tuple[str, ...]:
+        terms = self.analyze(query)
+        expanded = dict.fromkeys(terms)
+
+        for term in terms:
+            for extra in self.expansions.get(term, ()):
+                expanded.setdefault(extra)
+
+        # Expansion phrases in the query also search their abbreviation
+        for size in range(1, self._max_phrase + 1):
+            for i in range(len(terms) - size + 1):
+                for abbreviation in self.phrases.get(tuple(terms[i:i + size]), ()):
+                    expanded.setdefault(abbreviation)
+
+        return tuple(expanded)
+
+    def _term_prefixes(self, terms: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Lowercase prefixes that every word analyzing to one of ``terms`` starts with.
+
+        Stems are prefixes of the words they came from, except for -ies
+        plurals and joined compounds, which are matched by their leading part.
+        """
+        prefixes = set()
+        for term in terms:
+            prefixes.add(term[:-1] if term.endswith("y") and len(term) > 3 else term)
+            for (first, _), joined in self.compounds.items():
+                if joined == term:
+                    prefixes.add(first)
+        return tuple(sorted(prefixes))
+
+    def find_terms(self, text: str, terms: Tuple[str, ...]) -> Iterator[Tuple[int, str]]:
+        """Yield (offset, term) for occurrences of ``terms`` in unindexed text.
+
+        Locates candidate words with substring search on their prefixes and
+        analyzes only those, instead of analyzing every word of the text.
+        """
+        wanted = set(terms)
+        stopwords = self.stopwords
+        lower = text.lower()
+        seen = set()
+        for prefix in self.term_prefixes(terms):
+            start = lower.find(prefix)
+            while start != -1:
+                if start not in seen and (start == 0 or not lower[start - 1].isalnum()):
+                    seen.add(start)
+                    match = WORD_AT.match(lower, start)
+                    word = match.group(1).replace("-", "")
+                    joined = self.compounds.get((word, match.group(2))) if match.group(2) else None
+                    if joined in wanted:
+                        yield start, joined
+                    elif word not in stopwords and stem(word) in wanted:
+                        yield start, stem(word)
+                start = lower.find(prefix, start + 1)
+
+
+class LexicalIndex:
+    """Inverted index of analyzed terms: term -> {doc id: term count}.
+
+    Query terms missing from the vocabulary (typos, OCR variants) are mapped
+    to their nearest indexed terms through a deletion index and scored at
+    ``fuzzy_weight``.
+    """
+
+    def __init__(self, analyzer: Optional[TextAnalyzer] = None, fuzzy: bool = True,
+                 fuzzy_weight: float = 0.5):
+        self.analyzer = analyzer or default_analyzer
+        self.postings: Dict[str, Dict[Hashable, int]] = {}
+        self.fuzzy = fuzzy
+        self.fuzzy_weight = fuzzy_weight
+        # Built on the first unknown query term, then maintained incrementally;
+        # corrections are cached until the vocabulary changes
+        self.vocabulary: Optional[DeletionIndex] = None
+        self._corrections: Dict[Tuple[str, int], List[str]] = {}
+
+    def add(self, doc_id: Hashable, text: str):
+        self.add_terms(doc_id, self.analyzer.analyze(text))
+
+    def add_terms(self, doc_id: Hashable, terms: Iterable[str]):
+        """Index already analyzed ``terms`` (for callers that also use them elsewhere)"""
+        for term in terms:
+            term_postings = self.postings.get(term)
+            if term_postings is None:
+                term_postings = self.postings[term] = {}
+                if self.vocabulary is not None:
+                    self.vocabulary.add(term)
+                    self._corrections.clear()
+            term_postings[doc_id] = term_postings.get(doc_id, 0) + 1
+
+    def remove(self, doc_id: Hashable, text: str):
+        for term in set(self.analyzer.analyze(text)):
+            term_postings = self.postings.get(term)
+            if term_postings is not None:
+                term_postings.pop(doc_id, None)
+                if not term_postings:
+                    del self.postings[term]
+                    if self.vocabulary is not None:
+                        self.vocabulary.remove(term)
+                        self._corrections.clear()
+
+    def fuzzy_matches(self, term: str, limit: int = 3) -> List[str]:
+        """Indexed terms closest to an unknown ``term``, most frequent first on ties"""
+        key = (term, limit)
+        cached = self._corrections.get(key)
+        if cached is not None:
+            return cached
+
+        if self.vocabulary is None:
+            self.vocabulary = DeletionIndex()
+            for known in self.postings:
+                self.vocabulary.add(known)
+        matches = self.vocabulary.lookup(term, limit=limit * 2)
+        matches.sort(key=lambda match: (match[1], -len(self.postings.get(match[0], ()))))
+        if len(self._corrections) >= 4096:
+            self._corrections.clear()
+        corrections = self._corrections[key] = [candidate for candidate, _ in matches[:limit]]
+        return corrections
+
+    def search(self, query: str, limit: int = 5,
+               candidates: Optional[Collection[Hashable]] = None) -> List[Tuple[Hashable, float]]:
+        """Top ``limit`` (doc id, score) pairs, score = summed term counts.
+
+        ``candidates`` restricts scoring to those doc ids, e.g. the chunks a
+        conversation has already retrieved.
+        """
+        if candidates is not None:
+            return self._search_candidates(query, limit, candidates)
+        scores: Dict[Hashable, float] = {}
+        typed = set(self.analyzer.analyze(query)) if self.fuzzy else ()
+        for term in self.analyzer.analyze_query(query):
+            term_postings = self.postings.get(term)
+            if term_postings is not None:
+                for doc_id, count in term_postings.items():
+                    scores[doc_id] = scores.get(doc_id, 0) + count
+            elif term in typed and term not in self.analyzer.expansions:
+                # Only what the user typed is corrected, not synonym expansions
+                # or abbreviations the document happens not to use
+                for candidate in self.fuzzy_matches(term):
+                    for doc_id, count in self.postings[candidate].items():
+                        scores[doc_id] = scores.get(doc_id, 0) + count * self.fuzzy_weight
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def covers(self, query: str, candidates: Collection[Hashable]) -> bool:
+        """Whether every term typed in ``query`` occurs in one of ``candidates``"""
+        for term in set(self.analyzer.analyze(query)):
+            term_postings = self.postings.get(term, ())
+            if not any(doc_id in term_postings for doc_id in candidates):
+                return False
+        return True
+
+    def _search_candidates(self, query: str, limit: int,
+                           candidates: Collection[Hashable]) -> List[Tuple[Hashable, float]]:
+        # Same scoring as search, probing each term's postings per candidate
+        scores: Dict[Hashable, float] = {}
+        typed = set(self.analyzer.analyze(query)) if self.fuzzy else ()
+        for term in self.analyzer.analyze_query(query):
+            weighted = []
+            if term in self.postings:
+                weighted.append((self.postings[term], 1))
+            elif term in typed and term not in self.analyzer.expansions:
+                weighted.extend((self.postings[candidate], self.fuzzy_weight)
+                                for candidate in self.fuzzy_matches(term))
+            for term_postings, weight in weighted:
+                for doc_id in candidates:
+                    count = term_postings.get(doc_id)
+                    if count:
+                        scores[doc_id] = scores.get(doc_id, 0) + count * weight
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+default_analyzer = TextAnalyzer()
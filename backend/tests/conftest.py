@@ -0,0 +1,75 @@
+import io
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MANUAL = (
+    "--- Page 1 ---\n"
+    "The alternator output is 60 amps. Check the ammeter before takeoff.\n"
+    "--- Page 2 ---\n"
+    "The fuel selector has three positions. Drain the sumps before each flight.\n"
+    "--- Page 3 ---\n"
+    "Mooring ropes should be tied to the wing tie-down rings.\n"
+)
+
+
+@pytest.fixture
+def document_module(monkeypatch):
+    """The document routes in simple mode with no document loaded"""
+    from src.routes import document
+
+    monkeypatch.delenv("SHARED_CORPUS", raising=False)
+    for name, value in {
+        "simple_mode": True, "embeddings": None, "llm": None,
+        "current_vector_store": None, "current_document_title": None,
+        "current_index": None, "current_qa_chain": None,
+    }.items():
+        monkeypatch.setattr(document, name, value)
+    return document
+
+
+@pytest.fixture
+def document_client(document_module):
+    app = Flask(__name__)
+    app.register_blueprint(document_module.document_bp, url_prefix="/api/document")
+    return app.test_client()
+
+
+@pytest.fixture
+def uploaded(document_client):
+    """A client with MANUAL uploaded as manual.txt"""
+    response = document_client.post(
+        "/api/document/upload",
+        data={"file": (io.BytesIO(MANUAL.encode()), "manual.txt")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200, response.get_json()
+    return document_client
+
+
+@pytest.fixture
+def user_client(tmp_path):
+    """The user routes over a scratch SQLite database"""
+    from src.models.user import init_database
+    from src.routes.user import user_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(user_bp, url_prefix="/api")
+    init_database(app, str(tmp_path / "database" / "app.db"))
+    return app.test_client()
+
+
+@pytest.fixture
+def shared_corpus(monkeypatch):
+    """Shared-memory publishing under a prefix of its own, removed afterwards"""
+    from src.services import shared_corpus
+
+    monkeypatch.setenv("SHARED_CORPUS", "1")
+    monkeypatch.setenv("SHARED_CORPUS_PREFIX", f"test{os.getpid()}")
+    yield shared_corpus
+    for channel in ("poh", "document"):
+        shared_corpus.unpublish(channel)
@@ -0,0 +1,60 @@
+import threading
+
+from flask import Flask
+
+from src.services.admission import AdmissionGate, init_admission
+
+
+def test_gate_admits_up_to_its_limit():
+    gate = AdmissionGate("test", max_concurrent=2, max_queue=0)
+    assert gate.enter() is None
+    assert gate.enter() is None
+    assert gate.enter() == "queue_full"
+    gate.leave()
+    assert gate.enter() is None
+    assert gate.stats()["active"] == 2
+
+
+def test_queued_request_times_out():
+    gate = AdmissionGate("test", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+    assert gate.enter() is None
+    assert gate.enter() == "timeout"
+    assert gate.counters["timed_out"] == 1
+
+
+def test_slot_is_handed_to_the_oldest_waiter():
+    gate = AdmissionGate("test", max_concurrent=1, max_queue=1, queue_timeout=5)
+    assert gate.enter() is None
+    outcome = []
+    waiter = threading.Thread(target=lambda: outcome.append(gate.enter()))
+    waiter.start()
+    while gate.queue_depth == 0:
+        pass
+    gate.leave()
+    waiter.join()
+    assert outcome == [None]
+    assert gate.stats()["active"] == 1
+
+
+def make_app(limits):
+    app = Flask(__name__)
+    app.config["ADMISSION_CONTROL"] = True
+    app.config["ADMISSION_LIMITS"] = limits
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return "ok"
+
+    @app.route("/health")
+    def health():
+        return "ok"
+
+    init_admission(app)
+    return app.test_client()
+
+
+def test_oversized_body_is_refused():
+    client = make_app({"echo": {"max_concurrent": 1, "max_queue": 0, "max_body_bytes": 10}})
+    assert client.post("/echo", data="x" * 5).status_code == 200
+    assert client.post("/echo", data="x" * 50).status_code == 413
+    assert client.get("/health").status_code == 200
@@ -0,0 +1,31 @@
+from src.services.document_index import DocumentIndex, iter_pages, split_pages
+
+
+def test_markers_keep_the_preface_as_page_zero():
+    pages = split_pages("Preface line that matters.\nMore intro.\n--- Page 1 ---\nBody one\n--- Page 2 ---\nBody two\n")
+    assert pages == {0: "Preface line that matters.\nMore intro.", 1: "Body one", 2: "Body two"}
+
+
+def test_markers_without_preface():
+    assert split_pages("\n--- Page 3 ---\nBody three\n") == {3: "Body three"}
+
+
+def test_form_feeds():
+    assert split_pages("one\ftwo\fthree") == {1: "one", 2: "two", 3: "three"}
+
+
+def test_unmarked_text_is_cut_into_segments():
+    line = "word " * 15 + "\n"
+    blocks = [line * 50 for _ in range(10)]
+    pages = list(iter_pages(blocks, segment_size=1000))
+    assert [number for number, _ in pages] == list(range(1, len(pages) + 1))
+    assert all(len(text) <= 1000 for _, text in pages)
+    assert "".join(text for _, text in pages) == "".join(blocks)
+
+
+def test_update_pages_rechunks_only_changed_pages():
+    index = DocumentIndex("manual")
+    index.build({1: "Alternator output is 60 amps.", 2: "Fuel selector has three positions."})
+    summary = index.update_pages({2: "Fuel selector has two positions."})
+    assert summary["changed_pages"] == [2]
+    assert index.search("fuel selector")[0]["text"] == "Fuel selector has two positions."
@@ -0,0 +1,21 @@
+def test_query_without_document(document_client):
+    response = document_client.post("/api/document/query", json={"question": "alternator output"})
+    assert response.status_code == 400
+
+
+def test_query_matching_question(uploaded):
+    response = uploaded.post("/api/document/query", json={"question": "What is the alternator output?"})
+    assert response.status_code == 200
+    assert "60 amps" in response.get_json()["answer"]
+
+
+def test_query_without_match(uploaded):
+    for question in ("zebra", "what color is the propeller?"):
+        response = uploaded.post("/api/document/query", json={"question": question})
+        assert response.status_code == 200, response.get_json()
+        assert response.get_json()["mode"] == "simple_search"
+
+
+def test_query_unknown_topic(uploaded):
+    response = uploaded.post("/api/document/query", json={"question": "zebra"})
+    assert "not part of this document" in response.get_json()["answer"]
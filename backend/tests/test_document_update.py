@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+
+def test_update_without_document(document_client):
+    response = document_client.post("/api/document/update", json={"pages": {"1": "text"}})
+    assert response.status_code == 400
+
+
+def test_update_changed_page(uploaded, document_module):
+    response = uploaded.post("/api/document/update", json={"pages": {"2": "The fuel selector was moved."}})
+    assert response.status_code == 200
+    assert response.get_json()["changed_pages"] == [2]
+    assert document_module.current_index.pages[2] == "The fuel selector was moved."
+
+
+def test_remove_page(uploaded, document_module):
+    response = uploaded.post("/api/document/update", json={"removed_pages": [3]})
+    assert response.status_code == 200
+    assert sorted(document_module.current_index.pages) == [1, 2]
+
+
+@pytest.mark.parametrize("body", [
+    {"pages": {"2": 5}},
+    {"pages": ["a"]},
+    {"pages": "text"},
+    {"pages": {"two": "text"}},
+    {"removed_pages": "3"},
+    {"removed_pages": ["three"]},
+    ["pages"],
+    {},
+])
+def test_update_rejects_malformed_json(uploaded, body):
+    response = uploaded.post("/api/document/update", json=body)
+    assert response.status_code == 400, response.get_json()
+
+
+def post_revision(client, text, **form):
+    return client.post(
+        "/api/document/update",
+        data={"file": (io.BytesIO(text.encode()), "revision.txt"), "partial": "true", **form},
+        content_type="multipart/form-data",
+    )
+
+
+def test_partial_file_with_page_numbers(uploaded, document_module):
+    response = post_revision(uploaded, "Revised page two.\n", pages="2")
+    assert response.status_code == 200
+    assert document_module.current_index.pages[2].strip() == "Revised page two."
+
+
+def test_partial_file_with_markers(uploaded, document_module):
+    response = post_revision(uploaded, "--- Page 3 ---\nRevised page three.\n")
+    assert response.status_code == 200
+    assert response.get_json()["changed_pages"] == [3]
+
+
+@pytest.mark.parametrize("form", [{}, {"pages": "3-1"}, {"pages": "1,2"}])
+def test_partial_file_needs_page_numbers(uploaded, form):
+    response = post_revision(uploaded, "Revised text without markers.\n", **form)
+    assert response.status_code == 400
@@ -0,0 +1,28 @@
+from src.services.extractive_qa import extractive_answerer, should_answer_extractively
+
+PASSAGE = (
+    "The standard fuel capacity of the Cherokee Six is 84 gallons. "
+    "The tip tanks are filled separately and each one holds 17 gallons."
+)
+
+
+def answer(question):
+    return extractive_answerer.answer(question, [(None, PASSAGE)])
+
+
+def test_value_found_for_fully_covered_question():
+    result = answer("What is the standard fuel capacity?")
+    assert result["value"]["text"] == "84 gallons"
+    assert should_answer_extractively(result, llm_available=True)
+
+
+def test_partial_match_goes_to_the_llm():
+    result = answer("What is the fuel capacity of the tip tanks?")
+    assert not should_answer_extractively(result, llm_available=True)
+    # Without an LLM the extractive answer is all there is
+    assert should_answer_extractively(result, llm_available=False)
+
+
+def test_no_match():
+    assert answer("zebra") is None
+    assert not should_answer_extractively(None, llm_available=False)
@@ -0,0 +1,32 @@
+from src.services.document_index import DocumentIndex, SharedDocumentIndex
+
+
+def test_document_round_trip(shared_corpus):
+    index = DocumentIndex("manual")
+    index.build({1: "Alternator output is 60 amps.", 2: "Fuel selector has three positions."})
+    shared_corpus.publish_document("manual", index.pages, index.ordered_chunks())
+
+    reader = shared_corpus.SharedCorpusReader("document")
+    assert reader.poll()
+    title, pages, chunks = shared_corpus.document_from_segment(reader.segment)
+    assert title == "manual"
+    assert dict(pages.items()) == index.pages
+    assert [chunk["text"] for chunk in chunks] == [chunk["text"] for chunk in index.ordered_chunks()]
+
+    shared = SharedDocumentIndex(title, pages, chunks)
+    assert shared.search("alternator")[0]["text"] == "Alternator output is 60 amps."
+    copy = shared.to_document_index()
+    copy.update_pages({2: "Fuel selector has two positions."})
+    assert copy.pages[2] == "Fuel selector has two positions."
+    assert pages[2] == "Fuel selector has three positions."
+
+
+def test_reader_follows_new_versions(shared_corpus):
+    reader = shared_corpus.SharedCorpusReader("document")
+    assert not reader.poll()
+    shared_corpus.publish_document("first", {1: "one"}, [])
+    assert reader.poll()
+    assert not reader.poll()
+    shared_corpus.publish_document(None, {}, [])
+    assert reader.poll()
+    assert reader.segment.meta["loaded"] is False
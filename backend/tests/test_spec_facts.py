@@ -0,0 +1,28 @@
+import json
+import os
+
+from src.services.spec_facts import EXTRACTORS, FACT_SPECS, SpecFactTable, build_fact_table
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def test_every_fact_has_an_extractor():
+    extracted = {key for pattern in EXTRACTORS for key in pattern.groupindex}
+    assert extracted == set(FACT_SPECS)
+
+
+def test_facts_quote_their_value():
+    with open(os.path.join(DATA_DIR, "poh_content.json")) as f:
+        facts = build_fact_table(json.load(f)["pages"])
+    assert facts
+    for fact in facts.values():
+        assert fact["value"] in fact["evidence"]
+
+
+def test_unquoted_facts_are_not_served():
+    table = SpecFactTable({
+        "max_gross_weight": {"quantity": "maximum gross weight", "value": "3400", "unit": "lbs",
+                             "page": 37, "evidence": None},
+    })
+    assert len(table) == 0
+    assert table.lookup("What is the maximum gross weight?") is None
@@ -0,0 +1,80 @@
+import pytest
+
+
+def create(client, *names):
+    response = client.post("/api/users/bulk", json=[{"username": name, "email": f"{name}@example.com"}
+                                                    for name in names])
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()
+
+
+def test_bulk_create(user_client):
+    users = create(user_client, "ann", "bob")
+    assert [user["username"] for user in users] == ["ann", "bob"]
+    assert users[0]["id"] < users[1]["id"]
+
+
+def test_bulk_create_accepts_wrapped_list(user_client):
+    response = user_client.post("/api/users/bulk", json={"users": [{"username": "ann", "email": "a@x"}]})
+    assert response.status_code == 201
+
+
+@pytest.mark.parametrize("item, message", [
+    ({"username": {"a": 1}, "email": "a@x"}, "User 1: 'username' must be a non-empty string"),
+    ({"username": "bob", "email": ""}, "User 1: 'email' must be a non-empty string"),
+    ({"username": "bob", "email": None}, "User 1: 'email' must be a non-empty string"),
+    ({"username": "bob"}, "User 1 needs a username and an email"),
+    ("bob", "Every user must be an object"),
+])
+def test_bulk_create_rejects_invalid_items(user_client, item, message):
+    response = user_client.post("/api/users/bulk", json=[{"username": "ann", "email": "a@x"}, item])
+    assert response.status_code == 400
+    assert response.get_json()["error"] == message
+    # All or nothing
+    assert user_client.get("/api/users").get_json() == []
+
+
+@pytest.mark.parametrize("body", [[], {}, {"users": "ann"}, None])
+def test_bulk_create_rejects_empty_payloads(user_client, body):
+    assert user_client.post("/api/users/bulk", json=body).status_code == 400
+
+
+def test_bulk_create_duplicate_creates_nothing(user_client):
+    create(user_client, "ann")
+    response = user_client.post("/api/users/bulk", json=[{"username": "bob", "email": "b@x"},
+                                                         {"username": "ann", "email": "other@x"}])
+    assert response.status_code == 409
+    assert [user["username"] for user in user_client.get("/api/users").get_json()] == ["ann"]
+
+
+def test_bulk_update(user_client):
+    ann, bob = create(user_client, "ann", "bob")
+    response = user_client.patch("/api/users/bulk", json=[{"id": ann["id"], "email": "new@x"},
+                                                          {"id": bob["id"], "username": "robert"}])
+    assert response.get_json() == {"updated": 2}
+    users = {user["id"]: user for user in user_client.get("/api/users").get_json()}
+    assert users[ann["id"]]["email"] == "new@x"
+    assert users[bob["id"]]["username"] == "robert"
+
+
+@pytest.mark.parametrize("item, status", [
+    ({"id": "1", "email": "z@x"}, 400),
+    ({"id": True, "email": "z@x"}, 400),
+    ({"id": 1, "email": 5}, 400),
+    ({"id": 1, "username": ""}, 400),
+    ({"id": 999, "email": "z@x"}, 404),
+])
+def test_bulk_update_rejects_invalid_items(user_client, item, status):
+    create(user_client, "ann")
+    response = user_client.patch("/api/users/bulk", json=[item])
+    assert response.status_code == status
+    assert user_client.get("/api/users").get_json()[0]["email"] == "ann@example.com"
+
+
+def test_keyset_pagination_and_fields(user_client):
+    create(user_client, *(f"user{i}" for i in range(5)))
+    first = user_client.get("/api/users?limit=2&fields=username")
+    assert first.get_json() == [{"username": "user0"}, {"username": "user1"}]
+    second = user_client.get(f"/api/users?limit=2&after={first.headers['X-Next-Cursor']}")
+    assert [user["username"] for user in second.get_json()] == ["user2", "user3"]
+    assert user_client.get("/api/users?fields=password").status_code == 400